@@ -1,9 +1,15 @@
 import os
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flasgger import Swagger
 
 from config import DevelopmentConfig, TestingConfig, ProductionConfig
 from application.extensions import db, ma, migrate, limiter, cache
+from application.util import init_token_cache, init_password_hasher
+from application.caching import init_cache_invalidation
+from application.etag import conditional_response
+from application.metrics import init_metrics
+from application.query_log import init_query_log
 
 
 def _swagger_template():
@@ -51,7 +57,11 @@ def _swagger_template():
             "InventoryPayload": {
                 "type": "object",
                 "required": ["name"],
-                "properties": {"name": {"type": "string", "example": "Oil Filter"}},
+                "properties": {
+                    "name": {"type": "string", "example": "Oil Filter"},
+                    "quantity": {"type": "integer", "minimum": 0, "example": 24,
+                                 "description": "Units in stock; omit or null to not track"},
+                },
             },
             "TicketPayload": {
                 "type": "object",
@@ -80,6 +90,7 @@ def _swagger_template():
                 "properties": {
                     "id": {"type": "integer", "example": 10},
                     "name": {"type": "string", "example": "Oil Filter"},
+                    "quantity": {"type": "integer", "example": 24},
                 },
             },
             "TicketResponse": {
@@ -91,6 +102,33 @@ def _swagger_template():
                     "primary_mechanic_id": {"type": "integer", "example": 1},
                 },
             },
+            "TicketSummary": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer", "example": 3},
+                    "status": {"type": "string", "example": "open"},
+                    "primary_mechanic_id": {"type": "integer", "example": 1},
+                    "mechanic_count": {"type": "integer", "example": 2},
+                    "part_count": {"type": "integer", "example": 4},
+                },
+            },
+            "MechanicWorkload": {
+                "type": "object",
+                "properties": {
+                    "mechanic_id": {"type": "integer", "example": 1},
+                    "name": {"type": "string", "example": "Casey Torque"},
+                    "assigned": {"type": "integer", "example": 3},
+                    "primary": {"type": "integer", "example": 1},
+                },
+            },
+            "OutOfStock": {
+                "type": "object",
+                "properties": {
+                    "error": {"type": "string", "example": "out of stock"},
+                    "inventory_ids": {"type": "array", "items": {"type": "integer"},
+                                      "example": [12]},
+                },
+            },
             "ErrorResponse": {
                 "type": "object",
                 "properties": {"error": {"type": "string", "example": "Unauthorized"}},
@@ -129,8 +167,13 @@ def create_app(config_name: str | None = None) -> Flask:
     # Choose and load configuration
     chosen = _select_config_name(config_name)
     _load_config(app, chosen)
+    if app.config["PROXY_FIX_X_FOR"]:
+        # request.remote_addr becomes the client's, not the proxy's
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"],
+                                x_proto=1, x_host=1)
 
-    # Init extensions
+    # Init extensions (metrics first: it may pick the engine's pool class)
+    init_metrics(app)
     db.init_app(app)
     ma.init_app(app)
     migrate.init_app(app, db)
@@ -138,6 +181,18 @@ def create_app(config_name: str | None = None) -> Flask:
     # Respect RATELIMIT_ENABLED=False under testing (from TestingConfig)
     limiter.init_app(app)
     cache.init_app(app)
+    from application.models import Mechanic, Inventory, ServiceTicket
+    init_cache_invalidation({
+        Mechanic: {"mechanics", "workload"},
+        Inventory: {"inventory"},
+        # Any ticket write (assignments bump the ticket version too)
+        ServiceTicket: {"workload"},
+    })
+    from application.search import init_ticket_search
+    init_ticket_search()
+    init_token_cache(app)
+    init_password_hasher(app)
+    init_query_log(app)
 
     # Swagger
     Swagger(app, template=_swagger_template())
@@ -153,4 +208,6 @@ def create_app(config_name: str | None = None) -> Flask:
     app.register_blueprint(mechanic_bp, url_prefix="/mechanics")
     app.register_blueprint(inventory_bp, url_prefix="/inventory")
 
+    app.after_request(conditional_response)
+
     return app
@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-inventory_bp = Blueprint("inventory_bp", __name__)
+inventory_bp = Blueprint("inventory_bp", __name__, cli_group="inventory")
 
 from . import routes  # noqa: E402,F401
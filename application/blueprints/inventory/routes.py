@@ -1,28 +1,157 @@
-from flask import request, jsonify
-from sqlalchemy import desc
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import click
+from flask import request, jsonify, current_app
+from sqlalchemy import delete, insert, select
 from application.extensions import db, limiter, cache
-from application.models import Inventory
-from application.schemas import inventory_schema, inventories_schema
+from application.ratelimit import role_limit, page_cost
+from application.models import Inventory, part_usage
+from application.part_usage import rebuild, usage_days, usage_totals
+from application.schemas import dump_inventory, dump_inventories
+from application.pagination import keyset_page, name_prefix_filter, PaginationError
+from application.caching import list_cache_key, cacheable
+from sqlalchemy.orm.exc import StaleDataError
+from application.etag import (
+    row_etag, page_etag, is_fresh, not_modified, with_etag,
+    if_match_fails, precondition_failed, stale_delete)
 from application.util import token_required
+from application.bulk import chunked, read_records
 from . import inventory_bp
 
 
 @inventory_bp.route("/", methods=["GET"])
-@cache.cached(timeout=60, query_string=True)
+@limiter.limit(role_limit, cost=page_cost)
+@cache.cached(make_cache_key=list_cache_key("inventory"), response_filter=cacheable)
 def list_parts():
     """
     ---
     tags: [Inventory]
     summary: List parts (public)
+    description: Cursor paginated; pass next_cursor back as `after`.
+    parameters:
+      - { in: query, name: limit, type: integer, description: "Page size (capped at PAGE_SIZE_MAX)" }
+      - { in: query, name: after, type: string, description: "Opaque cursor from a previous page" }
+      - { in: query, name: name, type: string, description: "Name prefix filter" }
+      - { in: query, name: sort, type: string, enum: ["id", "-id", "name", "-name"], default: "-id" }
+    responses:
+      200:
+        description: OK
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items: { $ref: '#/definitions/InventoryResponse' }
+            next_cursor: { type: string, example: "eyJzIjoiLWlkIiwiaWQiOjQyfQ" }
+      304: { description: Not modified (If-None-Match matched the ETag) }
+      400: { description: Bad limit, cursor or sort, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    try:
+        query = name_prefix_filter(Inventory.query, Inventory.name)
+        rows, next_cursor = keyset_page(
+            query, Inventory.id, sortable={"name": Inventory.name})
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = page_etag("inventory", ((r.id, r.version) for r in rows), next_cursor)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag({"items": dump_inventories(rows), "next_cursor": next_cursor}, etag)
+
+
+USAGE_BUCKETS = {
+    "day": lambda d: d,
+    "week": lambda d: d - timedelta(days=d.weekday()),
+    "month": lambda d: d.replace(day=1),
+}
+
+
+@inventory_bp.route("/usage", methods=["GET"])
+@limiter.limit(role_limit)
+@token_required
+def part_usage_report(*, user_id, role):
+    """
+    ---
+    tags: [Inventory]
+    summary: Most used parts over a date window (auth)
+    description: >
+      Counts tickets each part is currently attached to, by the UTC day it
+      was attached, from counters maintained with every part add/remove.
+      Returns the `top` parts over [since, until] (default: the last 30
+      days); with `bucket`, each item also lists its per-day, per-week
+      (starting Monday) or per-month counts.
+    security: [{Bearer: []}]
+    parameters:
+      - { in: query, name: since, type: string, format: date, description: "First day (default until - 29 days)" }
+      - { in: query, name: until, type: string, format: date, description: "Last day (default today, UTC)" }
+      - { in: query, name: top, type: integer, default: 10, description: "Capped at PAGE_SIZE_MAX" }
+      - { in: query, name: bucket, type: string, enum: [day, week, month] }
     responses:
       200:
         description: OK
         schema:
-          type: array
-          items: { $ref: '#/definitions/InventoryResponse' }
+          type: object
+          properties:
+            since: { type: string, example: "2026-09-19" }
+            until: { type: string, example: "2026-10-18" }
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  inventory_id: { type: integer, example: 5 }
+                  name: { type: string, example: "Oil Filter" }
+                  uses: { type: integer, example: 42 }
+                  buckets:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        start: { type: string, example: "2026-10-12" }
+                        uses: { type: integer, example: 9 }
+      400: { description: Bad date, top or bucket, schema: { $ref: '#/definitions/ErrorResponse' } }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
-    rows = Inventory.query.order_by(desc(Inventory.id)).all()
-    return jsonify(inventories_schema.dump(rows)), 200
+    try:
+        until = _date_arg("until") or datetime.now(timezone.utc).date()
+        since = _date_arg("since") or until - timedelta(days=29)
+        top = int(request.args.get("top", 10))
+    except ValueError:
+        return jsonify({"error": "since/until must be YYYY-MM-DD and top an integer"}), 400
+    bucket = request.args.get("bucket")
+    if bucket is not None and bucket not in USAGE_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(USAGE_BUCKETS)}"}), 400
+    if since > until or top < 1:
+        return jsonify({"error": "need since <= until and top >= 1"}), 400
+    top = min(top, current_app.config["PAGE_SIZE_MAX"])
+
+    items = [{"inventory_id": pid, "name": name, "uses": int(uses)}
+             for pid, name, uses in usage_totals(since, until, top)]
+    if bucket and items:
+        start_of = USAGE_BUCKETS[bucket]
+        buckets = defaultdict(lambda: defaultdict(int))
+        for pid, day, uses in usage_days([i["inventory_id"] for i in items], since, until):
+            buckets[pid][start_of(day)] += uses
+        for item in items:
+            item["buckets"] = [
+                {"start": start.isoformat(), "uses": uses}
+                for start, uses in sorted(buckets[item["inventory_id"]].items()) if uses]
+    return jsonify({"since": since.isoformat(), "until": until.isoformat(),
+                    "items": items}), 200
+
+
+def _date_arg(name):
+    raw = request.args.get(name)
+    return date.fromisoformat(raw) if raw else None
+
+
+@inventory_bp.cli.command("rebuild-usage")
+@click.option("--chunk-size", default=500, show_default=True,
+              help="Parts recounted per transaction.")
+def rebuild_usage_command(chunk_size):
+    """Recompute part usage counters from ticket_parts."""
+    parts = rebuild(chunk_size)
+    click.echo(f"Rebuilt usage counters for {parts} parts.")
 
 
 @inventory_bp.route("/<int:pid>", methods=["GET"])
@@ -33,10 +162,14 @@ def get_part(pid):
     summary: Get part by id (public)
     responses:
       200: { description: OK, schema: { $ref: '#/definitions/InventoryResponse' } }
+      304: { description: Not modified (If-None-Match matched the ETag) }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     p = Inventory.query.get_or_404(pid)
-    return inventory_schema.jsonify(p), 200
+    etag = row_etag("inventory", p)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag(dump_inventory(p), etag)
 
 
 @inventory_bp.route("/", methods=["POST"])
@@ -54,17 +187,154 @@ def create_part(*, user_id, role):
         schema: { $ref: '#/definitions/InventoryPayload' }
     responses:
       201: { description: Created, schema: { $ref: '#/definitions/InventoryResponse' } }
-      400: { description: Missing name, schema: { $ref: '#/definitions/ErrorResponse' } }
+      400: { description: Missing name or bad quantity, schema: { $ref: '#/definitions/ErrorResponse' } }
       401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     data = request.get_json() or {}
     name = data.get("name")
     if not name:
         return jsonify({"error": "name required"}), 400
-    p = Inventory(name=name)
+    if not _valid_quantity(data.get("quantity")):
+        return jsonify({"error": QUANTITY_ERROR}), 400
+    p = Inventory(name=name, quantity=data.get("quantity"))
     db.session.add(p)
     db.session.commit()
-    return inventory_schema.jsonify(p), 201
+    return jsonify(dump_inventory(p)), 201
+
+
+QUANTITY_ERROR = "quantity must be a non-negative integer or null"
+
+
+def _valid_quantity(value) -> bool:
+    return value is None or (
+        isinstance(value, int) and not isinstance(value, bool) and value >= 0)
+
+
+def _import_quantity(record: dict, fmt: str):
+    """CSV cells are strings: blank means null, digits mean a count."""
+    value = record.get("quantity")
+    if fmt != "csv" or value is None:
+        return value
+    value = value.strip()
+    if not value:
+        return None
+    return int(value) if value.isascii() and value.isdigit() else value
+
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+NAME_MAX = Inventory.name.type.length
+
+
+@inventory_bp.route("/import", methods=["POST"])
+@limiter.limit(lambda: current_app.config["INVENTORY_IMPORT_RATE_LIMIT"])
+@token_required
+def import_parts(*, user_id, role):
+    """
+    ---
+    tags: [Inventory]
+    summary: Import parts from CSV or NDJSON (auth)
+    description: >
+      Send a CSV body with a `name` header (Content-Type text/csv) or one
+      JSON object with a `name` per line (application/x-ndjson). An
+      optional `quantity` column or key sets stock as on create; blank or
+      missing leaves it null (untracked). The body
+      is parsed as it streams in and inserted INVENTORY_IMPORT_CHUNK_SIZE
+      rows at a time, all in one transaction. Names already in inventory,
+      or repeated in the upload, are skipped. Errors are reported by line
+      number (the first INVENTORY_IMPORT_MAX_ERRORS of them).
+    security: [{Bearer: []}]
+    consumes: [text/csv, application/x-ndjson]
+    parameters:
+      - in: body
+        name: payload
+        schema: { type: string, example: "name,quantity\\nOil Filter,12\\nBrake Pad,\\n" }
+    responses:
+      200:
+        description: Imported
+        schema:
+          type: object
+          properties:
+            received: { type: integer, example: 3 }
+            inserted: { type: integer, example: 2 }
+            duplicates: { type: integer, example: 1 }
+            failed: { type: integer, example: 0 }
+            errors:
+              type: array
+              items:
+                type: object
+                properties:
+                  line: { type: integer, example: 4 }
+                  error: { type: string, example: "name required" }
+      207: { description: Imported, but some lines failed (see errors) }
+      400: { description: Unreadable body, schema: { $ref: '#/definitions/ErrorResponse' } }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
+      415: { description: Unsupported Content-Type, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    fmt = IMPORT_FORMATS.get(request.mimetype)
+    if fmt is None:
+        return jsonify({"error": "send text/csv or application/x-ndjson"}), 415
+    chunk_size = current_app.config["INVENTORY_IMPORT_CHUNK_SIZE"]
+    max_errors = current_app.config["INVENTORY_IMPORT_MAX_ERRORS"]
+
+    # Names seen in this upload; grows with the number of distinct parts.
+    seen = set()
+    counts = {"received": 0, "inserted": 0, "duplicates": 0, "failed": 0}
+    errors = []
+    pending = []
+
+    def fail(line, error):
+        counts["failed"] += 1
+        if len(errors) < max_errors:
+            errors.append({"line": line, "error": error})
+
+    def flush():
+        names = [row["name"] for row in pending]
+        existing = set()
+        for part in chunked(names):
+            existing.update(db.session.scalars(
+                select(Inventory.name).where(Inventory.name.in_(part))))
+        rows = [row for row in pending if row["name"] not in existing]
+        if rows:
+            # executemany: one prepared INSERT for the whole chunk
+            db.session.execute(insert(Inventory), rows)
+        counts["inserted"] += len(rows)
+        counts["duplicates"] += len(pending) - len(rows)
+        pending.clear()
+
+    try:
+        for line, record, error in read_records(request.stream, fmt):
+            counts["received"] += 1
+            if error:
+                fail(line, error)
+                continue
+            name = record.get("name")
+            name = name.strip() if isinstance(name, str) else None
+            if not name:
+                fail(line, "name required")
+            elif len(name) > NAME_MAX:
+                fail(line, f"name longer than {NAME_MAX} characters")
+            elif not _valid_quantity(quantity := _import_quantity(record, fmt)):
+                fail(line, QUANTITY_ERROR)
+            elif name in seen:
+                counts["duplicates"] += 1
+            else:
+                seen.add(name)
+                pending.append({"name": name, "quantity": quantity})
+                if len(pending) >= chunk_size:
+                    flush()
+        if pending:
+            flush()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+
+    status = 207 if counts["failed"] else 200
+    return jsonify({**counts, "errors": errors}), status
 
 
 @inventory_bp.route("/<int:pid>", methods=["PUT"])
@@ -74,24 +344,42 @@ def update_part(pid, *, user_id, role):
     ---
     tags: [Inventory]
     summary: Update part (auth)
+    description: >
+      Send If-Match with the ETag from a GET to reject lost updates; stock
+      taken by tickets changes the ETag too. quantity sets the stock
+      level (null stops tracking it).
     security: [{Bearer: []}]
     parameters:
+      - { in: header, name: If-Match, type: string, required: false }
       - in: body
         name: payload
         schema:
           type: object
           properties:
             name: { type: string, example: "Oil Filter XL" }
+            quantity: { type: integer, minimum: 0, example: 30 }
     responses:
       200: { description: Updated, schema: { $ref: '#/definitions/InventoryResponse' } }
+      400: { description: Bad quantity, schema: { $ref: '#/definitions/ErrorResponse' } }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: If-Match doesn't match the current ETag, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     p = Inventory.query.get_or_404(pid)
+    if if_match_fails(row_etag("inventory", p)):
+        return precondition_failed()
     data = request.get_json() or {}
+    if not _valid_quantity(data.get("quantity")):
+        return jsonify({"error": QUANTITY_ERROR}), 400
     if "name" in data:
         p.name = data["name"]
-    db.session.commit()
-    return inventory_schema.jsonify(p), 200
+    if "quantity" in data:
+        p.quantity = data["quantity"]
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed()
+    return with_etag(dump_inventory(p), row_etag("inventory", p))
 
 
 @inventory_bp.route("/<int:pid>", methods=["DELETE"])
@@ -111,8 +399,14 @@ def delete_part(pid, *, user_id, role):
           properties:
             deleted: { type: integer, example: 5 }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: Changed by another request while deleting, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     p = Inventory.query.get_or_404(pid)
+    # the ORM drops the part's ticket_parts rows; drop its counters with them
+    db.session.execute(delete(part_usage).where(part_usage.c.inventory_id == pid))
     db.session.delete(p)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return stale_delete(Inventory, pid)
     return jsonify({"deleted": pid}), 200
@@ -1,28 +1,127 @@
-from flask import request, jsonify
-from sqlalchemy import desc
+from flask import request, jsonify, current_app
+from sqlalchemy import func, literal, select, union_all
 from application.extensions import db, limiter, cache
-from application.models import Mechanic
-from application.schemas import mechanic_schema, mechanics_schema
+from application.ratelimit import role_limit, page_cost
+from application.models import Mechanic, ServiceTicket, ticket_mechanics
+from application.schemas import dump_mechanic, dump_mechanics
+from application.pagination import keyset_page, name_prefix_filter, PaginationError
+from application.caching import list_cache_key, cacheable
+from sqlalchemy.orm.exc import StaleDataError
+from application.etag import (
+    row_etag, page_etag, is_fresh, not_modified, with_etag,
+    if_match_fails, precondition_failed, stale_delete)
 from application.util import token_required
 from . import mechanic_bp
 
 
 @mechanic_bp.route("/", methods=["GET"])
-@cache.cached(timeout=60, query_string=True)
+@limiter.limit(role_limit, cost=page_cost)
+@cache.cached(make_cache_key=list_cache_key("mechanics"), response_filter=cacheable)
 def list_mechanics():
     """
     ---
     tags: [Mechanics]
     summary: List mechanics (public)
+    description: Cursor paginated; pass next_cursor back as `after`.
+    parameters:
+      - { in: query, name: limit, type: integer, description: "Page size (capped at PAGE_SIZE_MAX)" }
+      - { in: query, name: after, type: string, description: "Opaque cursor from a previous page" }
+      - { in: query, name: name, type: string, description: "Name prefix filter" }
+      - { in: query, name: sort, type: string, enum: ["id", "-id", "name", "-name"], default: "-id" }
     responses:
       200:
         description: OK
         schema:
-          type: array
-          items: { $ref: '#/definitions/MechanicResponse' }
+          type: object
+          properties:
+            items:
+              type: array
+              items: { $ref: '#/definitions/MechanicResponse' }
+            next_cursor: { type: string, example: "eyJzIjoiLWlkIiwiaWQiOjQyfQ" }
+      304: { description: Not modified (If-None-Match matched the ETag) }
+      400: { description: Bad limit, cursor or sort, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
-    rows = Mechanic.query.order_by(desc(Mechanic.id)).all()
-    return jsonify(mechanics_schema.dump(rows)), 200
+    try:
+        query = name_prefix_filter(Mechanic.query, Mechanic.name)
+        rows, next_cursor = keyset_page(
+            query, Mechanic.id, sortable={"name": Mechanic.name})
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = page_etag("mechanic", ((r.id, r.version) for r in rows), next_cursor)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag({"items": dump_mechanics(rows), "next_cursor": next_cursor}, etag)
+
+
+@mechanic_bp.route("/workload", methods=["GET"])
+@limiter.limit(role_limit)
+@token_required
+def mechanic_workload(*, user_id, role):
+    """
+    ---
+    tags: [Mechanics]
+    summary: Ticket counts per mechanic (auth)
+    description: >
+      For every mechanic, the number of tickets they are assigned to and
+      the number where they are the primary mechanic, counting only tickets
+      whose status is one of `status` (repeatable, default open). Cached
+      for WORKLOAD_CACHE_TIMEOUT seconds; ticket and mechanic writes
+      invalidate it.
+    security: [{Bearer: []}]
+    parameters:
+      - { in: query, name: status, type: array, items: { type: string }, collectionFormat: multi, default: [open] }
+    responses:
+      200:
+        description: OK
+        schema:
+          type: object
+          properties:
+            status:
+              type: array
+              items: { type: string, example: "open" }
+            items:
+              type: array
+              items: { $ref: '#/definitions/MechanicWorkload' }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    key = list_cache_key("workload")()
+    body = cache.get(key)
+    if body is None:
+        statuses = sorted(set(request.args.getlist("status"))) or ["open"]
+        body = {"status": statuses, "items": _workload(statuses)}
+        cache.set(key, body, timeout=current_app.config["WORKLOAD_CACHE_TIMEOUT"])
+    return jsonify(body), 200
+
+
+def _workload(statuses):
+    """
+    One GROUP BY over (mechanic, ticket) pairs: assignments from
+    ticket_mechanics plus primary_mechanic_id, unioned, then outer-joined
+    to mechanic so idle mechanics report zeros.
+    """
+    assigned = select(
+        ticket_mechanics.c.mechanic_id.label("mechanic_id"),
+        literal(1).label("assigned"), literal(0).label("primary"),
+    ).join(ServiceTicket, ServiceTicket.id == ticket_mechanics.c.ticket_id) \
+        .where(ServiceTicket.status.in_(statuses))
+    primary = select(
+        ServiceTicket.primary_mechanic_id,
+        literal(0), literal(1),
+    ).where(ServiceTicket.primary_mechanic_id.is_not(None),
+            ServiceTicket.status.in_(statuses))
+    pairs = union_all(assigned, primary).subquery()
+    counts = select(
+        pairs.c.mechanic_id,
+        func.sum(pairs.c.assigned).label("assigned"),
+        func.sum(pairs.c.primary).label("primary"),
+    ).group_by(pairs.c.mechanic_id).subquery()
+    rows = db.session.execute(
+        select(Mechanic.id, Mechanic.name,
+               func.coalesce(counts.c.assigned, 0), func.coalesce(counts.c.primary, 0))
+        .outerjoin(counts, counts.c.mechanic_id == Mechanic.id)
+        .order_by(Mechanic.id))
+    return [{"mechanic_id": mid, "name": name, "assigned": int(a), "primary": int(p)}
+            for mid, name, a, p in rows]
 
 
 @mechanic_bp.route("/<int:mid>", methods=["GET"])
@@ -33,10 +132,14 @@ def get_mechanic(mid):
     summary: Get mechanic by id (public)
     responses:
       200: { description: OK, schema: { $ref: '#/definitions/MechanicResponse' } }
+      304: { description: Not modified (If-None-Match matched the ETag) }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     m = Mechanic.query.get_or_404(mid)
-    return mechanic_schema.jsonify(m), 200
+    etag = row_etag("mechanic", m)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag(dump_mechanic(m), etag)
 
 
 @mechanic_bp.route("/", methods=["POST"])
@@ -64,7 +167,7 @@ def create_mechanic(*, user_id, role):
     m = Mechanic(name=name)
     db.session.add(m)
     db.session.commit()
-    return mechanic_schema.jsonify(m), 201
+    return jsonify(dump_mechanic(m)), 201
 
 
 @mechanic_bp.route("/<int:mid>", methods=["PUT"])
@@ -74,8 +177,10 @@ def update_mechanic(mid, *, user_id, role):
     ---
     tags: [Mechanics]
     summary: Update mechanic (auth)
+    description: Send If-Match with the ETag from a GET to reject lost updates.
     security: [{Bearer: []}]
     parameters:
+      - { in: header, name: If-Match, type: string, required: false }
       - in: body
         name: payload
         schema:
@@ -85,13 +190,20 @@ def update_mechanic(mid, *, user_id, role):
     responses:
       200: { description: Updated, schema: { $ref: '#/definitions/MechanicResponse' } }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: If-Match doesn't match the current ETag, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     m = Mechanic.query.get_or_404(mid)
+    if if_match_fails(row_etag("mechanic", m)):
+        return precondition_failed()
     data = request.get_json() or {}
     if "name" in data:
         m.name = data["name"]
-    db.session.commit()
-    return mechanic_schema.jsonify(m), 200
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed()
+    return with_etag(dump_mechanic(m), row_etag("mechanic", m))
 
 
 @mechanic_bp.route("/<int:mid>", methods=["DELETE"])
@@ -111,8 +223,12 @@ def delete_mechanic(mid, *, user_id, role):
           properties:
             deleted: { type: integer, example: 2 }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: Changed by another request while deleting, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     m = Mechanic.query.get_or_404(mid)
     db.session.delete(m)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return stale_delete(Mechanic, mid)
     return jsonify({"deleted": mid}), 200
@@ -1,8 +1,22 @@
-from flask import request, jsonify
-from sqlalchemy import desc
+from collections import defaultdict, deque
+
+from flask import request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy import Integer, cast, delete, func, insert, literal, select, true, update
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from application.extensions import db, limiter
-from application.models import ServiceTicket, Mechanic, Inventory
-from application.schemas import ticket_schema, tickets_schema
+from application.ratelimit import role_limit, page_cost, export_cost
+from application.models import (
+    ServiceTicket, Mechanic, Inventory, ticket_mechanics, ticket_parts)
+from application.schemas import dump_ticket, dump_tickets
+from application.pagination import (
+    keyset_page, keyset_window, int_arg, is_db_int, PaginationError)
+from application.bulk import insert_ignore, id_list, chunked
+from application.etag import (
+    make_etag, page_etag, is_fresh, not_modified, with_etag,
+    if_match_fails, precondition_failed, stale_delete)
+from application.search import ranked_matches, search_terms
+from application.part_usage import count_links, uncount_links
 from application.util import token_required
 from . import ticket_bp
 
@@ -40,27 +54,464 @@ def create_ticket(*, user_id, role):
 
     db.session.add(t)
     db.session.commit()
-    return ticket_schema.jsonify(t), 201
+    return jsonify(dump_ticket(t)), 201
+
+
+def _bulk_item_count():
+    # Rate-limit cost: one unit per ticket, not per request.
+    data = request.get_json(silent=True)
+    return max(len(data), 1) if isinstance(data, list) else 1
+
+
+@ticket_bp.route("/bulk", methods=["POST"])
+@limiter.limit(lambda: current_app.config["BULK_TICKET_RATE_LIMIT"],
+               cost=_bulk_item_count)
+@token_required
+def bulk_create_tickets(*, user_id, role):
+    """
+    ---
+    tags: [Tickets]
+    summary: Create many tickets in one transaction (auth)
+    description: >
+      Accepts an array of TicketPayload objects and returns one result per
+      item, in order. Invalid items are reported and skipped; the rest are
+      inserted together. Each item counts against BULK_TICKET_RATE_LIMIT.
+    security: [{Bearer: []}]
+    parameters:
+      - in: body
+        name: payload
+        schema:
+          type: array
+          items: { $ref: '#/definitions/TicketPayload' }
+    responses:
+      201:
+        description: All items created
+        schema:
+          type: object
+          properties:
+            created: { type: integer, example: 2 }
+            failed: { type: integer, example: 0 }
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  index: { type: integer, example: 0 }
+                  status: { type: integer, example: 201 }
+                  ticket: { $ref: '#/definitions/TicketResponse' }
+                  error: { type: string, example: "description required" }
+      207: { description: Some items failed, see results }
+      400: { description: "Not an array or too many items (error), or every item failed (results)" }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "expected a non-empty array of tickets"}), 400
+    max_items = current_app.config["BULK_TICKET_MAX_ITEMS"]
+    if len(data) > max_items:
+        return jsonify({"error": f"at most {max_items} tickets per request"}), 400
+
+    results = [None] * len(data)
+    pending = []  # (index, row)
+    for i, item in enumerate(data):
+        mid = item.get("primary_mechanic_id") if isinstance(item, dict) else None
+        if not isinstance(item, dict):
+            results[i] = {"index": i, "status": 400, "error": "item must be an object"}
+        elif not item.get("description"):
+            results[i] = {"index": i, "status": 400, "error": "description required"}
+        elif not isinstance(item["description"], str):
+            results[i] = {"index": i, "status": 400, "error": "description must be a string"}
+        elif mid is not None and (not isinstance(mid, int) or isinstance(mid, bool)):
+            results[i] = {"index": i, "status": 400,
+                          "error": "primary_mechanic_id must be an integer"}
+        elif mid is not None and not is_db_int(mid):
+            results[i] = {"index": i, "status": 400,
+                          "error": "primary_mechanic_id is out of range"}
+        else:
+            pending.append((i, {
+                "description": item["description"],
+                "status": "open",
+                "user_id": user_id,
+                "primary_mechanic_id": item.get("primary_mechanic_id"),
+            }))
+
+    # Resolve every referenced mechanic with one IN query. Unknown ids are
+    # dropped, matching create_ticket.
+    wanted = {row["primary_mechanic_id"] for _, row in pending
+              if row["primary_mechanic_id"] is not None}
+    known = set(db.session.scalars(
+        select(Mechanic.id).where(Mechanic.id.in_(wanted)))) if wanted else set()
+    for _, row in pending:
+        if row["primary_mechanic_id"] not in known:
+            row["primary_mechanic_id"] = None
+
+    if pending:
+        ids = _insert_tickets([row for _, row in pending])
+        db.session.commit()
+        for (i, row), tid in zip(pending, ids):
+            # A transient ticket serializes like create_ticket's response
+            # (empty collections, no lazy loads) without reading it back.
+            ticket = dump_ticket(ServiceTicket(id=tid, **row))
+            results[i] = {"index": i, "status": 201, "ticket": ticket}
+
+    created = len(pending)
+    failed = len(data) - created
+    status = 201 if not failed else (207 if created else 400)
+    return jsonify({"created": created, "failed": failed, "results": results}), status
+
+
+def _insert_tickets(rows):
+    """INSERT all rows in one batched statement; return ids in row order."""
+    if not db.engine.dialect.insert_executemany_returning:
+        # No RETURNING (MySQL): let the unit of work batch the INSERTs
+        # and read back the generated keys.
+        tickets = [ServiceTicket(**row) for row in rows]
+        db.session.add_all(tickets)
+        db.session.flush()
+        return [t.id for t in tickets]
+
+    # Multi-row RETURNING isn't guaranteed to come back in VALUES order,
+    # and asking SQLAlchemy to sort it makes SQLite fall back to one INSERT
+    # per row. Rows with identical values are interchangeable, so match
+    # the returned ids to inputs by content instead.
+    returned = db.session.execute(
+        insert(ServiceTicket).returning(
+            ServiceTicket.id, ServiceTicket.description,
+            ServiceTicket.primary_mechanic_id),
+        rows).all()
+    slots = defaultdict(deque)
+    for pos, row in enumerate(rows):
+        slots[(row["description"], row["primary_mechanic_id"])].append(pos)
+    ids = [None] * len(rows)
+    for r in sorted(returned, key=lambda r: r.id):
+        ids[slots[(r.description, r.primary_mechanic_id)].popleft()] = r.id
+    return ids
 
 
 @ticket_bp.route("/", methods=["GET"])
+@limiter.limit(role_limit, cost=page_cost)
 @token_required
 def list_tickets(*, user_id, role):
     """
     ---
     tags: [Tickets]
-    summary: List tickets (auth)
+    summary: List tickets, newest first (auth)
+    description: >
+      Cursor paginated. Pass the returned next_cursor as `after` to get
+      the following page; next_cursor is null on the last page.
+      `view=summary` returns TicketSummary items (ids, status and
+      mechanic/part counts) from a single query, for dashboard polling.
+      Filters combine with AND and are each served by an index.
     security: [{Bearer: []}]
+    parameters:
+      - { in: query, name: limit, type: integer, description: "Page size (capped at PAGE_SIZE_MAX)" }
+      - { in: query, name: after, type: string, description: "Opaque cursor from a previous page" }
+      - { in: query, name: view, type: string, enum: [full, summary], default: full }
+      - { in: query, name: status, type: string, description: "e.g. open" }
+      - { in: query, name: user_id, type: integer, description: "Tickets created by this user" }
+      - { in: query, name: primary_mechanic_id, type: integer }
+      - { in: query, name: mechanic_id, type: integer, description: "Tickets this mechanic is assigned to" }
+      - { in: query, name: part_id, type: integer, description: "Tickets using this part" }
     responses:
       200:
         description: OK
         schema:
-          type: array
-          items: { $ref: '#/definitions/TicketResponse' }
+          type: object
+          properties:
+            items:
+              type: array
+              items: { $ref: '#/definitions/TicketResponse' }
+            next_cursor: { type: string, example: "eyJpZCI6NDJ9" }
+      304: { description: Not modified (If-None-Match matched the ETag) }
+      400: { description: Bad limit, cursor, view or filter, schema: { $ref: '#/definitions/ErrorResponse' } }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    view = request.args.get("view", "full")
+    if view == "summary":
+        return _list_ticket_summaries()
+    if view != "full":
+        return jsonify({"error": "view must be 'full' or 'summary'"}), 400
+    try:
+        if request.if_none_match:
+            # Revalidation: one aggregate over the page decides the 304.
+            window, limit, _ = keyset_window(
+                _filter_tickets(db.session.query(ServiceTicket.id)), ServiceTicket.id)
+            etag = _page_etag(db.session.execute(_page_summary(window, limit)).one())
+            if is_fresh(etag):
+                return not_modified(etag)
+        # selectin: one extra IN query per collection for the whole page,
+        # instead of a ticket x mechanics x parts join.
+        query = ServiceTicket.query.options(
+            selectinload(ServiceTicket.mechanics),
+            selectinload(ServiceTicket.parts))
+        rows, next_cursor = keyset_page(_filter_tickets(query), ServiceTicket.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = _page_etag(_rows_summary(rows, next_cursor is not None))
+    return with_etag({"items": dump_tickets(rows), "next_cursor": next_cursor}, etag)
+
+
+def _filter_tickets(query):
+    """Apply ?status/user_id/primary_mechanic_id/mechanic_id/part_id."""
+    status = request.args.get("status")
+    if status:
+        query = query.filter(ServiceTicket.status == status)
+    for param, column in (("user_id", ServiceTicket.user_id),
+                          ("primary_mechanic_id", ServiceTicket.primary_mechanic_id)):
+        value = int_arg(param)
+        if value is not None:
+            query = query.filter(column == value)
+    # Association filters read the (target_id, ticket_id) reverse indexes.
+    for param, table, fk in (("mechanic_id", ticket_mechanics, "mechanic_id"),
+                             ("part_id", ticket_parts, "inventory_id")):
+        value = int_arg(param)
+        if value is not None:
+            query = query.filter(ServiceTicket.id.in_(
+                select(table.c.ticket_id).where(table.c[fk] == value)))
+    return query
+
+
+def _ticket_versions():
+    """
+    Per-ticket ETag inputs computed in SQL: the ticket's version plus the
+    count and version sum of its mechanics and parts, so renaming a linked
+    mechanic or part also changes the ticket's ETag. Must agree with
+    _ticket_token.
+    """
+    def linked(table, fk, model):
+        joined = table.join(model, table.c[fk] == model.id)
+        where = table.c.ticket_id == ServiceTicket.id
+        count = select(func.count(model.id)).select_from(joined) \
+            .where(where).correlate(ServiceTicket).scalar_subquery()
+        total = select(cast(func.coalesce(func.sum(model.version), 0), Integer)) \
+            .select_from(joined).where(where).correlate(ServiceTicket).scalar_subquery()
+        return count, total
+
+    return db.session.query(
+        ServiceTicket.id, ServiceTicket.version,
+        *linked(ticket_mechanics, "mechanic_id", Mechanic),
+        *linked(ticket_parts, "inventory_id", Inventory))
+
+
+def _page_summary(window, limit):
+    """
+    A list page's ETag inputs as one aggregate row: which tickets are on
+    it (count, min and max id), the sums of their versions and of their
+    mechanics' and parts' counts and versions, and whether a next page
+    exists. Versions only grow and edits bump the ticket, so any change
+    to the page moves one of these. Must agree with _rows_summary.
+    """
+    page = window.limit(limit).cte("page")
+    on_page = select(page.c.id)
+
+    def totals(name, table, fk, model):
+        return select(func.count(model.id).label("n"), func.sum(model.version).label("v")) \
+            .select_from(table.join(model, table.c[fk] == model.id)) \
+            .where(table.c.ticket_id.in_(on_page)).subquery(name)
+
+    tickets = select(func.count(ServiceTicket.id).label("n"),
+                     func.min(ServiceTicket.id).label("lo"),
+                     func.max(ServiceTicket.id).label("hi"),
+                     func.sum(ServiceTicket.version).label("v")) \
+        .where(ServiceTicket.id.in_(on_page)).subquery("tickets")
+    mechanics = totals("mechanics", ticket_mechanics, "mechanic_id", Mechanic)
+    parts = totals("parts", ticket_parts, "inventory_id", Inventory)
+    return select(
+        tickets.c.n, tickets.c.lo, tickets.c.hi, _int_sum(tickets.c.v),
+        mechanics.c.n, _int_sum(mechanics.c.v), parts.c.n, _int_sum(parts.c.v),
+        window.offset(limit).limit(1).exists(),
+    ).select_from(tickets.join(mechanics, true()).join(parts, true()))
+
+
+def _int_sum(total):
+    # SUM is NULL over no rows, and a DECIMAL on MySQL
+    return cast(func.coalesce(total, 0), Integer)
+
+
+def _rows_summary(rows, more) -> tuple:
+    ids = [t.id for t in rows]
+    mechanics = [m for t in rows for m in t.mechanics]
+    parts = [p for t in rows for p in t.parts]
+    return (len(ids), min(ids, default=None), max(ids, default=None),
+            sum(t.version for t in rows),
+            len(mechanics), sum(m.version for m in mechanics),
+            len(parts), sum(p.version for p in parts), more)
+
+
+def _page_etag(summary) -> str:
+    *totals, more = summary
+    return make_etag("ticket-page", request.args.get("sort") or "-id",
+                     *totals, bool(more))
+
+
+def _ticket_token(t):
+    return (t.id, t.version,
+            len(t.mechanics), sum(m.version for m in t.mechanics),
+            len(t.parts), sum(p.version for p in t.parts))
+
+
+def _touch_ticket(tid, expected_version=None) -> bool:
+    """
+    Bump the ticket's version. Association edits don't UPDATE the ticket
+    row, so this is what changes its ETag. With expected_version it is a
+    compare-and-set; False means another writer got there first.
+    """
+    stmt = update(ServiceTicket).where(ServiceTicket.id == tid)
+    if expected_version is not None:
+        stmt = stmt.where(ServiceTicket.version == expected_version)
+    result = db.session.execute(
+        stmt.values(version=ServiceTicket.version + 1)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def _if_match_version(tid):
+    """
+    With If-Match: the ticket version the client's ETag was based on, or
+    False if the ETag is stale. Without If-Match: None (unconditional).
+    """
+    if not request.if_match:
+        return None
+    token = _ticket_versions().filter(ServiceTicket.id == tid).first()
+    if token is None or if_match_fails(make_etag("ticket", *token)):
+        return False
+    return token.version
+
+
+def _ticket_response(t):
+    return with_etag(dump_ticket(t), make_etag("ticket", *_ticket_token(t)))
+
+
+def _list_ticket_summaries():
+    # Column-level rows with correlated counts: no ORM objects, no
+    # identity map, and no nested schemas to walk.
+    mechanic_count = select(func.count()).where(
+        ticket_mechanics.c.ticket_id == ServiceTicket.id
+    ).correlate(ServiceTicket).scalar_subquery()
+    part_count = select(func.count()).where(
+        ticket_parts.c.ticket_id == ServiceTicket.id
+    ).correlate(ServiceTicket).scalar_subquery()
+    query = db.session.query(
+        ServiceTicket.id,
+        ServiceTicket.status,
+        ServiceTicket.primary_mechanic_id,
+        mechanic_count.label("mechanic_count"),
+        part_count.label("part_count"),
+    )
+    try:
+        rows, next_cursor = keyset_page(_filter_tickets(query), ServiceTicket.id)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = page_etag("ticket-summary", (tuple(r) for r in rows), next_cursor)
+    if is_fresh(etag):
+        return not_modified(etag)
+    items = [dict(row._mapping) for row in rows]
+    return with_etag({"items": items, "next_cursor": next_cursor}, etag)
+
+
+@ticket_bp.route("/export", methods=["GET"])
+@limiter.limit(role_limit, cost=export_cost)
+@token_required
+def export_tickets(*, user_id, role):
+    """
+    ---
+    tags: [Tickets]
+    summary: Export every ticket as NDJSON (auth)
+    description: >
+      Streams one TicketResponse JSON object per line, oldest first. Rows
+      are read by id keyset EXPORT_CHUNK_SIZE at a time, with each chunk's
+      mechanics and parts loaded in one batch, so memory stays flat
+      however many tickets there are.
+    produces: [application/x-ndjson]
+    security: [{Bearer: []}]
+    responses:
+      200: { description: "One ticket per line" }
       401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
-    rows = ServiceTicket.query.order_by(desc(ServiceTicket.id)).all()
-    return jsonify(tickets_schema.dump(rows)), 200
+    size = current_app.config["EXPORT_CHUNK_SIZE"]
+    base = (
+        select(ServiceTicket)
+        .options(selectinload(ServiceTicket.mechanics),
+                 selectinload(ServiceTicket.parts))
+        .order_by(ServiceTicket.id)
+        .limit(size)
+    )
+
+    def generate():
+        # Keyset chunks rather than yield_per: selectin loaders can't run
+        # under yield_per, and each chunk ends its read before we yield.
+        dumps = current_app.json.dumps
+        last = 0
+        while True:
+            chunk = db.session.scalars(base.where(ServiceTicket.id > last)).all()
+            if not chunk:
+                return
+            yield "".join(dumps(dump_ticket(t)) + "\n" for t in chunk)
+            if len(chunk) < size:
+                return
+            last = chunk[-1].id
+            # drop the chunk from the identity map before the next one
+            db.session.expunge_all()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+SEARCH_SORTS = ("rank", "id", "-id")
+
+
+@ticket_bp.route("/search", methods=["GET"])
+@limiter.limit(role_limit, cost=page_cost)
+@token_required
+def search_tickets(*, user_id, role):
+    """
+    ---
+    tags: [Tickets]
+    summary: Full-text search over ticket descriptions (auth)
+    description: >
+      Matches tickets whose description contains every word of `q`, best
+      match first (or `sort=-id` for newest first). Cursor paginated like
+      GET /tickets/. Backed by FTS5 on SQLite, a GIN tsvector index on
+      Postgres and a FULLTEXT index on MySQL; other databases get an
+      unranked LIKE scan.
+    security: [{Bearer: []}]
+    parameters:
+      - { in: query, name: q, type: string, required: true, description: "Words to match" }
+      - { in: query, name: limit, type: integer, description: "Page size (capped at PAGE_SIZE_MAX)" }
+      - { in: query, name: after, type: string, description: "Opaque cursor from a previous page" }
+      - { in: query, name: sort, type: string, enum: ["rank", "id", "-id"], default: "rank" }
+    responses:
+      200:
+        description: OK
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items: { $ref: '#/definitions/TicketResponse' }
+            next_cursor: { type: string }
+      400: { description: Missing q, or bad limit, cursor or sort, schema: { $ref: '#/definitions/ErrorResponse' } }
+      401: { description: Unauthorized, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    terms = search_terms(request.args.get("q", ""))
+    if not terms:
+        return jsonify({"error": "q required"}), 400
+    if (request.args.get("sort") or "rank") not in SEARCH_SORTS:
+        return jsonify({"error": "sort must be one of: " + ", ".join(SEARCH_SORTS)}), 400
+    matches = ranked_matches(db.engine.dialect.name, terms)
+    try:
+        # Page over (id, rank) from the index alone, then load the page.
+        hits, next_cursor = keyset_page(
+            db.session.query(matches.c.id, matches.c.rank), matches.c.id,
+            sortable={"rank": matches.c.rank}, default_sort="rank")
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    ids = [h.id for h in hits]
+    by_id = {t.id: t for t in db.session.scalars(
+        select(ServiceTicket).where(ServiceTicket.id.in_(ids)).options(
+            selectinload(ServiceTicket.mechanics),
+            selectinload(ServiceTicket.parts)))} if ids else {}
+    rows = [by_id[i] for i in ids if i in by_id]
+    return jsonify({"items": dump_tickets(rows), "next_cursor": next_cursor})
 
 
 @ticket_bp.route("/<int:tid>", methods=["GET"])
@@ -73,10 +524,19 @@ def get_ticket(tid, *, user_id, role):
     security: [{Bearer: []}]
     responses:
       200: { description: OK, schema: { $ref: '#/definitions/TicketResponse' } }
+      304: { description: Not modified (If-None-Match matched the ETag) }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
-    t = ServiceTicket.query.get_or_404(tid)
-    return ticket_schema.jsonify(t), 200
+    if request.if_none_match:
+        token = _ticket_versions().filter(ServiceTicket.id == tid).first()
+        if token is not None and is_fresh(make_etag("ticket", *token)):
+            return not_modified(make_etag("ticket", *token))
+    # A single row: joining one collection is cheaper than a second
+    # round trip, but joining both would multiply mechanics by parts.
+    t = ServiceTicket.query.options(
+        joinedload(ServiceTicket.mechanics),
+        selectinload(ServiceTicket.parts)).get_or_404(tid)
+    return with_etag(dump_ticket(t), make_etag("ticket", *_ticket_token(t)))
 
 
 @ticket_bp.route("/<int:tid>/edit", methods=["PUT"])
@@ -86,9 +546,13 @@ def edit_mechanics(tid, *, user_id, role):
     ---
     tags: [Tickets]
     summary: Add/Remove mechanics on a ticket (auth)
-    description: Send lists of ids to add/remove.
+    description: >
+      Send lists of mechanic ids to add/remove. Additions already on the
+      ticket and unknown ids are ignored; removals are applied after
+      additions. Send If-Match with the ticket's ETag to reject lost updates.
     security: [{Bearer: []}]
     parameters:
+      - { in: header, name: If-Match, type: string, required: false }
       - in: body
         name: payload
         schema:
@@ -104,23 +568,106 @@ def edit_mechanics(tid, *, user_id, role):
               example: [3]
     responses:
       200: { description: Updated, schema: { $ref: '#/definitions/TicketResponse' } }
+      400: { description: Body isn't an object or ids aren't integer lists, schema: { $ref: '#/definitions/ErrorResponse' } }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: If-Match doesn't match the ticket's ETag, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     t = ServiceTicket.query.get_or_404(tid)
     data = request.get_json() or {}
-    add_ids = data.get("add_ids", [])
-    remove_ids = data.get("remove_ids", [])
+    try:
+        add_ids = id_list(data, "add_ids")
+        remove_ids = id_list(data, "remove_ids")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if add_ids:
-        for m in Mechanic.query.filter(Mechanic.id.in_(add_ids)).all():
-            if m not in t.mechanics:
-                t.mechanics.append(m)
+    expected = _if_match_version(tid)
+    # Claim the version first: a concurrent editor makes this match
+    # nothing, and we bail out before writing any links.
+    if expected is False or not _touch_ticket(tid, expected):
+        db.session.rollback()
+        return precondition_failed()
+    _apply_links(ticket_mechanics.c.ticket_id, ticket_mechanics.c.mechanic_id,
+                 Mechanic.id, tid, add_ids, remove_ids)
+    db.session.commit()
+    return _ticket_response(t)
 
-    if remove_ids:
-        t.mechanics = [m for m in t.mechanics if m.id not in set(remove_ids)]
 
-    db.session.commit()
-    return ticket_schema.jsonify(t), 200
+def _take_stock(inventory_ids) -> bool:
+    """
+    Take one unit of each part with UPDATE ... SET quantity = quantity - 1
+    WHERE quantity >= 1. The condition is checked under the row's write
+    lock, so concurrent requests can't oversell and no SELECT ... FOR
+    UPDATE is needed. False if any part was short; roll back then.
+    """
+    taken = 0
+    for chunk in chunked(inventory_ids):
+        taken += db.session.execute(
+            update(Inventory)
+            .where(Inventory.id.in_(chunk), Inventory.quantity >= 1)
+            .values(quantity=Inventory.quantity - 1, version=Inventory.version + 1)
+            .execution_options(synchronize_session=False)).rowcount
+    return taken == len(inventory_ids)
+
+
+def _tracked_parts(inventory_ids) -> list[int]:
+    tracked = []
+    for chunk in chunked(inventory_ids):
+        tracked.extend(db.session.scalars(
+            select(Inventory.id).where(
+                Inventory.id.in_(chunk), Inventory.quantity.is_not(None))))
+    return tracked
+
+
+def _out_of_stock(inventory_ids):
+    """409 naming the parts (of inventory_ids) that are out of stock now."""
+    short = []
+    for chunk in chunked(inventory_ids):
+        short.extend(db.session.scalars(
+            select(Inventory.id).where(Inventory.id.in_(chunk), Inventory.quantity < 1)
+            .order_by(Inventory.id)))
+    return jsonify({"error": "out of stock", "inventory_ids": short}), 409
+
+
+def _apply_links(ticket_col, target_col, target_pk, tid, add_ids, remove_ids):
+    """
+    Add and remove association rows for one ticket with set-based SQL,
+    never loading or diffing the ORM collection.
+    """
+    table = ticket_col.table
+    # INSERT ... SELECT keeps unknown ids out without a lookup round trip;
+    # the insert-ignore skips rows already on the ticket.
+    for chunk in chunked(add_ids):
+        db.session.execute(
+            insert_ignore(table).from_select(
+                [ticket_col.name, target_col.name],
+                select(literal(tid), target_pk).where(target_pk.in_(chunk))))
+    for chunk in chunked(remove_ids):
+        db.session.execute(
+            delete(table).where(ticket_col == tid, target_col.in_(chunk)))
+
+
+def _link_parts(tid, add_ids) -> list[int]:
+    """
+    Link the known parts among add_ids to the ticket and return the ids
+    this call inserted. A link another request inserted first is not
+    returned, so of two identical concurrent edits only one takes stock.
+    """
+    def link(ids):
+        return insert_ignore(ticket_parts).from_select(
+            ["ticket_id", "inventory_id"],
+            select(literal(tid), Inventory.id).where(Inventory.id.in_(ids)))
+
+    inserted = []
+    if db.session.get_bind().dialect.insert_returning:
+        for chunk in chunked(add_ids):
+            inserted.extend(db.session.scalars(
+                link(chunk).returning(ticket_parts.c.inventory_id)))
+    else:
+        # MySQL: no RETURNING, so one INSERT IGNORE per id for its rowcount
+        for pid in add_ids:
+            if db.session.execute(link([pid])).rowcount == 1:
+                inserted.append(pid)
+    return inserted
 
 
 @ticket_bp.route("/<int:tid>/add-part/<int:pid>", methods=["POST"])
@@ -131,16 +678,97 @@ def add_part(tid, pid, *, user_id, role):
     tags: [Tickets]
     summary: Add a part to a ticket (auth)
     security: [{Bearer: []}]
+    description: >
+      Takes one unit of the part's stock if its quantity is tracked, or
+      fails with 409 when none is left. Adding a part that is already on
+      the ticket changes nothing. The ETag header can be sent as If-Match
+      on the next edit.
     responses:
       200: { description: OK, schema: { $ref: '#/definitions/TicketResponse' } }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      409: { description: Out of stock, schema: { $ref: '#/definitions/OutOfStock' } }
     """
     t = ServiceTicket.query.get_or_404(tid)
-    p = Inventory.query.get_or_404(pid)
-    if p not in t.parts:
-        t.parts.append(p)
-        db.session.commit()
-    return ticket_schema.jsonify(t), 200
+    part = Inventory.query.get_or_404(pid)
+    # Insert first: of two identical concurrent calls only one inserts
+    # the link, and only that one takes stock and counts usage.
+    inserted = db.session.execute(
+        insert_ignore(ticket_parts).values(ticket_id=tid, inventory_id=pid)).rowcount
+    if inserted != 1:
+        db.session.rollback()
+        return _ticket_response(t)
+    if part.quantity is not None and not _take_stock([pid]):
+        db.session.rollback()
+        return _out_of_stock([pid])
+    count_links(tid, [pid])
+    _touch_ticket(tid)
+    db.session.commit()
+    return _ticket_response(t)
+
+
+@ticket_bp.route("/<int:tid>/parts", methods=["PUT"])
+@token_required
+def edit_parts(tid, *, user_id, role):
+    """
+    ---
+    tags: [Tickets]
+    summary: Add/Remove parts on a ticket (auth)
+    description: >
+      Send lists of inventory ids to add/remove. Additions already on the
+      ticket and unknown ids are ignored; removals are applied after
+      additions. Each added part takes one unit of stock if its quantity
+      is tracked; if any is out of stock nothing changes and the response
+      is 409. Removing a part doesn't restock it. Send If-Match with the
+      ticket's ETag to reject lost updates.
+    security: [{Bearer: []}]
+    parameters:
+      - { in: header, name: If-Match, type: string, required: false }
+      - in: body
+        name: payload
+        schema:
+          type: object
+          properties:
+            add_ids:
+              type: array
+              items: { type: integer }
+              example: [10, 11, 12]
+            remove_ids:
+              type: array
+              items: { type: integer }
+              example: [4]
+    responses:
+      200: { description: Updated, schema: { $ref: '#/definitions/TicketResponse' } }
+      400: { description: Body isn't an object or ids aren't integer lists, schema: { $ref: '#/definitions/ErrorResponse' } }
+      404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      409: { description: Out of stock, schema: { $ref: '#/definitions/OutOfStock' } }
+      412: { description: If-Match doesn't match the ticket's ETag, schema: { $ref: '#/definitions/ErrorResponse' } }
+    """
+    t = ServiceTicket.query.get_or_404(tid)
+    data = request.get_json() or {}
+    try:
+        add_ids = id_list(data, "add_ids")
+        remove_ids = id_list(data, "remove_ids")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    expected = _if_match_version(tid)
+    if expected is False or not _touch_ticket(tid, expected):
+        db.session.rollback()
+        return precondition_failed()
+    # Insert first, as in add_part: stock and usage counters move with
+    # the links this request created only. Removed links are uncounted
+    # while their attached_at is still readable.
+    new_ids = _link_parts(tid, add_ids)
+    tracked = _tracked_parts(new_ids)
+    if tracked and not _take_stock(tracked):
+        db.session.rollback()
+        return _out_of_stock(tracked)
+    count_links(tid, new_ids)
+    uncount_links(tid, remove_ids)
+    _apply_links(ticket_parts.c.ticket_id, ticket_parts.c.inventory_id,
+                 Inventory.id, tid, [], remove_ids)
+    db.session.commit()
+    return _ticket_response(t)
 
 
 @ticket_bp.route("/<int:tid>", methods=["DELETE"])
@@ -160,8 +788,17 @@ def delete_ticket(tid, *, user_id, role):
           properties:
             deleted: { type: integer, example: 7 }
       404: { description: Not found, schema: { $ref: '#/definitions/ErrorResponse' } }
+      412: { description: Changed by another request while deleting, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     t = ServiceTicket.query.get_or_404(tid)
+    db.session.execute(
+        delete(ticket_mechanics).where(ticket_mechanics.c.ticket_id == tid))
+    uncount_links(tid)
+    db.session.execute(
+        delete(ticket_parts).where(ticket_parts.c.ticket_id == tid))
     db.session.delete(t)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return stale_delete(ServiceTicket, tid)
     return jsonify({"deleted": tid}), 200
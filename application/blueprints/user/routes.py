@@ -1,12 +1,16 @@
-from flask import request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
-import jwt
-import datetime
+from flask import request, jsonify
+from sqlalchemy import update
 
 from application.extensions import db, limiter
+from application.ratelimit import role_limit, page_cost
 from application.models import User
-from application.schemas import user_schema, users_schema
-from application.util import token_required
+from application.schemas import dump_user, dump_users
+from application.pagination import keyset_page, name_prefix_filter, PaginationError
+from sqlalchemy.orm.exc import StaleDataError
+from application.etag import (
+    row_etag, page_etag, is_fresh, not_modified, with_etag,
+    if_match_fails, precondition_failed, stale_delete)
+from application.util import token_required, make_token, hash_password, verify_password
 from . import user_bp
 
 
@@ -46,6 +50,9 @@ def signup():
         schema: { $ref: '#/definitions/ErrorResponse' }
         examples:
           application/json: { "error": "Email already exists" }
+      503:
+        description: Password hashing pool saturated
+        schema: { $ref: '#/definitions/ErrorResponse' }
     """
     data = request.get_json() or {}
     name = data.get("name")
@@ -57,14 +64,19 @@ def signup():
     if User.query.filter_by(email=email).first():
         return jsonify({"error": "Email already exists"}), 409
 
+    try:
+        password_hash = hash_password(password)
+    except TimeoutError:
+        return jsonify({"error": "Server busy, try again"}), 503
+
     u = User(
         name=name,
         email=email,
-        password_hash=generate_password_hash(password)
+        password_hash=password_hash
     )
     db.session.add(u)
     db.session.commit()
-    return user_schema.jsonify(u), 201
+    return jsonify(dump_user(u)), 201
 
 
 # LOGIN — accept /users/login and /users/login/
@@ -101,6 +113,9 @@ def login():
         schema: { $ref: '#/definitions/ErrorResponse' }
         examples:
           application/json: { "error": "Invalid credentials" }
+      503:
+        description: Password hashing pool saturated
+        schema: { $ref: '#/definitions/ErrorResponse' }
     """
     data = request.get_json() or {}
     email = data.get("email")
@@ -110,50 +125,89 @@ def login():
         return jsonify({"error": "email and password required"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user:
         return jsonify({"error": "Invalid credentials"}), 401
+    try:
+        ok, needs_rehash = verify_password(user.password_hash, password)
+    except TimeoutError:
+        return jsonify({"error": "Server busy, try again"}), 503
+    if not ok:
+        return jsonify({"error": "Invalid credentials"}), 401
+    if needs_rehash:
+        # Upgrade to the configured method/cost; the login still succeeds
+        # if the pool is too busy to do it now. A Core UPDATE leaves the
+        # row version alone, so concurrent logins that both rehash don't
+        # fail each other's version check.
+        try:
+            db.session.execute(
+                update(User).where(User.id == user.id)
+                .values(password_hash=hash_password(password))
+                .execution_options(synchronize_session=False))
+            db.session.commit()
+        except TimeoutError:
+            pass
 
-    payload = {
-        "user_id": user.id,
-        "role": "user",
-        "exp": datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=1),
-    }
-    token = jwt.encode(
-        payload, current_app.config["SECRET_KEY"], algorithm="HS256")
-    if isinstance(token, bytes):
-        token = token.decode("utf-8")
-
-    return jsonify({"token": token}), 200
+    return jsonify({"token": make_token(user.id)}), 200
 
 
 # LIST (GET /users) — requires auth
 @user_bp.route("/", methods=["GET"])
+@limiter.limit(role_limit, cost=page_cost)
 @token_required
 def list_users(*, user_id, role):
     """
     ---
     tags: [Users]
     summary: List users (auth)
-    description: Returns all users.
+    description: >
+      Returns users one page at a time. Pass next_cursor back as `after`
+      to fetch the next page. Sorting by name isn't offered because
+      name is optional; filtering by name prefix is.
     security: [{Bearer: []}]
+    parameters:
+      - { in: query, name: limit, type: integer, description: "Page size (capped at PAGE_SIZE_MAX)" }
+      - { in: query, name: after, type: string, description: "Opaque cursor from a previous page" }
+      - { in: query, name: name, type: string, description: "Name prefix filter" }
+      - { in: query, name: sort, type: string, enum: ["id", "-id", "email", "-email"], default: "-id" }
     responses:
       200:
         description: OK
         schema:
-          type: array
-          items: { $ref: '#/definitions/UserResponse' }
+          type: object
+          properties:
+            items:
+              type: array
+              items: { $ref: '#/definitions/UserResponse' }
+            next_cursor: { type: string, example: "eyJzIjoiLWlkIiwiaWQiOjF9" }
         examples:
           application/json:
-            - { "id": 2, "email": "bob@example.com" }
-            - { "id": 1, "email": "alice@example.com" }
+            items:
+              - { "id": 2, "email": "bob@example.com" }
+              - { "id": 1, "email": "alice@example.com" }
+            next_cursor: null
+      304:
+        description: Not modified (If-None-Match matched the ETag)
+      400:
+        description: Bad limit, cursor or sort
+        schema: { $ref: '#/definitions/ErrorResponse' }
+        examples:
+          application/json: { "error": "invalid cursor" }
       401:
         description: Unauthorized
         schema: { $ref: '#/definitions/ErrorResponse' }
         examples:
           application/json: { "error": "Unauthorized" }
     """
-    users = User.query.order_by(User.id.desc()).all()
-    return jsonify(users_schema.dump(users)), 200
+    try:
+        query = name_prefix_filter(User.query, User.name)
+        users, next_cursor = keyset_page(
+            query, User.id, sortable={"email": User.email})
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = page_etag("user", ((u.id, u.version) for u in users), next_cursor)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag({"items": dump_users(users), "next_cursor": next_cursor}, etag)
 
 
 # READ (GET /users/<id>) — requires auth
@@ -171,6 +225,8 @@ def get_user(uid, *, user_id, role):
         schema: { $ref: '#/definitions/UserResponse' }
         examples:
           application/json: { "id": 1, "email": "alice@example.com" }
+      304:
+        description: Not modified (If-None-Match matched the ETag)
       401:
         description: Unauthorized
         schema: { $ref: '#/definitions/ErrorResponse' }
@@ -183,7 +239,10 @@ def get_user(uid, *, user_id, role):
           application/json: { "error": "Not found" }
     """
     u = User.query.get_or_404(uid)
-    return user_schema.jsonify(u), 200
+    etag = row_etag("user", u)
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag(dump_user(u), etag)
 
 
 # UPDATE (PUT /users/<id>) — requires auth
@@ -194,9 +253,12 @@ def update_user(uid, *, user_id, role):
     ---
     tags: [Users]
     summary: Update a user (auth)
-    description: Currently supports updating the email.
+    description: >
+      Currently supports updating the email. Send If-Match with the ETag
+      from a GET to reject lost updates.
     security: [{Bearer: []}]
     parameters:
+      - { in: header, name: If-Match, type: string, required: false }
       - in: body
         name: payload
         schema:
@@ -222,13 +284,24 @@ def update_user(uid, *, user_id, role):
         schema: { $ref: '#/definitions/ErrorResponse' }
         examples:
           application/json: { "error": "Not found" }
+      412:
+        description: If-Match doesn't match the current ETag
+        schema: { $ref: '#/definitions/ErrorResponse' }
+        examples:
+          application/json: { "error": "Resource was modified; re-fetch and retry" }
     """
     u = User.query.get_or_404(uid)
+    if if_match_fails(row_etag("user", u)):
+        return precondition_failed()
     data = request.get_json() or {}
     if "email" in data:
         u.email = data["email"]
-    db.session.commit()
-    return user_schema.jsonify(u), 200
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed()
+    return with_etag(dump_user(u), row_etag("user", u))
 
 
 # DELETE (DELETE /users/<id>) — requires auth
@@ -260,8 +333,12 @@ def delete_user(uid, *, user_id, role):
         schema: { $ref: '#/definitions/ErrorResponse' }
         examples:
           application/json: { "error": "Not found" }
+      412: { description: Changed by another request while deleting, schema: { $ref: '#/definitions/ErrorResponse' } }
     """
     u = User.query.get_or_404(uid)
     db.session.delete(u)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return stale_delete(User, uid)
     return jsonify({"deleted": uid}), 200
@@ -0,0 +1,89 @@
+import codecs
+import csv
+import json
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from application.extensions import db
+from application.pagination import is_db_int
+
+# Keep IN lists well under SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def insert_ignore(table):
+    """INSERT for `table` that skips rows whose primary key already exists."""
+    name = db.session.get_bind().dialect.name
+    if name == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    if name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return sqlite.insert(table).on_conflict_do_nothing()
+
+
+def id_list(data: dict, key: str) -> list[int]:
+    """
+    Read a list of integer ids from a JSON payload, de-duplicated and in
+    first-seen order. Raises ValueError if the payload isn't an object or
+    the value isn't a list of 64-bit integers.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    value = data.get(key) or []
+    if not isinstance(value, list) or not all(is_db_int(v) for v in value):
+        raise ValueError(f"{key} must be a list of integer ids")
+    return list(dict.fromkeys(value))
+
+
+def chunked(ids, size=CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _lines(stream):
+    """
+    Decode a byte stream line by line with readline(). WSGI servers may
+    hand over their raw input object (gunicorn's Body), which has read
+    and readline but none of the io.RawIOBase methods.
+    """
+    first = True
+    while True:
+        raw = stream.readline()
+        if not raw:
+            return
+        if first:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+            first = False
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError("body must be UTF-8") from None
+
+
+def read_records(stream, fmt: str):
+    """
+    Parse a CSV (with a header row) or NDJSON byte stream one line at a
+    time, yielding (line_number, record, error) where exactly one of
+    record/error is set. Raises ValueError if the stream itself is
+    unreadable (missing CSV header, bad encoding).
+    """
+    lines = _lines(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames:
+            raise ValueError("CSV body needs a header row")
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None, "invalid JSON"
+            continue
+        if isinstance(record, dict):
+            yield line_no, record, None
+        else:
+            yield line_no, None, "line must be a JSON object"
@@ -0,0 +1,94 @@
+"""
+Generation-keyed response caching for the public list endpoints.
+
+Each namespace ("mechanics", "inventory", ...) has a generation token
+stored in the cache itself. Cached list pages embed the token in their
+key, so replacing it after a commit orphans every page of that namespace
+at once, in every worker that shares the backend. Stale pages simply
+age out.
+"""
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from application.extensions import cache
+
+_GEN_KEY = "gen/%s"
+_PENDING = "cache_invalidate"
+
+# Model class -> namespaces whose cached pages show that model.
+MODEL_NAMESPACES = {}
+
+
+def _generation(namespace: str) -> str:
+    gen = cache.get(_GEN_KEY % namespace)
+    if gen is None:
+        # add() is a no-op if another worker set it first
+        cache.add(_GEN_KEY % namespace, uuid4().hex, timeout=0)
+        gen = cache.get(_GEN_KEY % namespace)
+    return gen
+
+
+def list_cache_key(namespace: str):
+    """make_cache_key for @cache.cached: path + sorted query + generation."""
+    def make_key(*args, **kwargs):
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"{namespace}/{_generation(namespace)}{request.path}?{query}"
+    return make_key
+
+
+def cacheable(rv) -> bool:
+    """response_filter: only cache successful responses."""
+    status = rv[1] if isinstance(rv, tuple) else getattr(rv, "status_code", 200)
+    return status == 200
+
+
+def invalidate(*namespaces: str) -> None:
+    for namespace in namespaces:
+        cache.set(_GEN_KEY % namespace, uuid4().hex, timeout=0)
+
+
+def invalidate_on_commit(session, *namespaces: str) -> None:
+    """Queue namespaces to invalidate once the session's transaction commits."""
+    session.info.setdefault(_PENDING, set()).update(namespaces)
+
+
+def _namespaces_for(obj_or_class) -> set:
+    cls = obj_or_class if isinstance(obj_or_class, type) else type(obj_or_class)
+    return set(MODEL_NAMESPACES.get(cls, ()))
+
+
+def _after_flush(session, flush_context):
+    stale = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        stale |= _namespaces_for(obj)
+    if stale:
+        invalidate_on_commit(session, *stale)
+
+
+def _do_orm_execute(state):
+    # Bulk insert/update/delete statements skip the flush entirely.
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper:
+        stale = _namespaces_for(state.bind_mapper.class_)
+        if stale:
+            invalidate_on_commit(state.session, *stale)
+
+
+def _after_commit(session):
+    invalidate(*session.info.pop(_PENDING, ()))
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def init_cache_invalidation(model_namespaces: dict) -> None:
+    MODEL_NAMESPACES.update(model_namespaces)
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,77 @@
+"""
+Strong ETags from row version columns.
+
+Single rows are tagged from (kind, id, version). List pages are tagged
+from the (id, version) tokens of the rows on the page plus next_cursor;
+the full ticket list uses one aggregate over its page instead.
+Views check If-None-Match before serializing anything. PUT endpoints
+honour If-Match and answer 412 when the resource has moved on.
+"""
+import hashlib
+
+from flask import request, make_response, jsonify
+from sqlalchemy import select
+
+from application.extensions import db
+
+
+def make_etag(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_etag(kind: str, obj) -> str:
+    return make_etag(kind, obj.id, obj.version)
+
+
+def page_etag(kind: str, tokens, next_cursor) -> str:
+    return make_etag(kind, tuple(tokens), next_cursor)
+
+
+def is_fresh(etag: str) -> bool:
+    """True when the client's If-None-Match already names this ETag."""
+    return etag in request.if_none_match
+
+
+def if_match_fails(etag: str) -> bool:
+    """True when the request sent If-Match and it doesn't name this ETag."""
+    return bool(request.if_match) and etag not in request.if_match
+
+
+def precondition_failed():
+    return jsonify({"error": "Resource was modified; re-fetch and retry"}), 412
+
+
+def stale_delete(model, pk):
+    """
+    Answer a DELETE whose versioned row didn't match (StaleDataError):
+    404 if a concurrent request deleted it, 412 if it was updated.
+    """
+    db.session.rollback()
+    # ask the database, not the identity map (it still holds the object)
+    if db.session.scalar(select(model.id).where(model.id == pk)) is None:
+        return jsonify({"error": "Not found"}), 404
+    return precondition_failed()
+
+
+def not_modified(etag: str):
+    response = make_response("", 304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(body, etag: str, status: int = 200):
+    response = jsonify(body)
+    response.set_etag(etag)
+    return response, status
+
+
+def conditional_response(response):
+    """
+    after_request hook: turn a tagged 200 into a 304 when it matches
+    If-None-Match. Covers responses served from the list cache, where
+    the view itself doesn't run.
+    """
+    if request.method in ("GET", "HEAD") and response.status_code == 200 \
+            and response.get_etag()[0]:
+        response.make_conditional(request)
+    return response
@@ -0,0 +1,404 @@
+"""
+In-process metrics, served in the Prometheus text format on GET /metrics.
+
+Values live in this process only: under gunicorn each worker reports its
+own series, so scrape the workers individually (or sum across them).
+"""
+import bisect
+import hmac
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, has_app_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+from application.extensions import db, limiter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> state
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            items = sorted((k, self._copy(v)) for k, v in self._values.items())
+        for key, state in items:
+            yield from self._lines(list(zip(self.labelnames, key)), state)
+
+    def _copy(self, state):
+        return state
+
+    def _lines(self, pairs, state):
+        yield f"{self.name}{_labels(pairs)} {_number(state)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels) -> None:
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key: tuple, amount=1) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def mirror(self, total, **labels) -> None:
+        """Copy a running total kept elsewhere; for collectors."""
+        with self._lock:
+            self._values[self._key(labels)] = total
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    # Seconds; suits request and query latencies.
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                       0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """(cumulative bucket counts, sum, count) for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            counts, total, count = list(state[0]), state[1], state[2]
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        return counts, total, count
+
+    def _copy(self, state):
+        return list(state[0]), state[1], state[2]
+
+    def _lines(self, pairs, state):
+        counts, total, count = state
+        running = 0
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            running += n
+            yield f"{self.name}_bucket{_labels([*pairs, ('le', _number(bound))])} {running}"
+        yield f"{self.name}_sum{_labels(pairs)} {_number(total)}"
+        yield f"{self.name}_count{_labels(pairs)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        # Called before each render to refresh gauges read from elsewhere.
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), **kwargs) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, **kwargs))
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- connection pool -------------------------------------------------------
+
+POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time a request waited to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0))
+POOL_TIMEOUTS = REGISTRY.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout")
+POOL_GAUGES = {
+    "size": REGISTRY.gauge("db_pool_size", "Connections the pool keeps open"),
+    "checked_out": REGISTRY.gauge(
+        "db_pool_checked_out", "Connections currently checked out"),
+    "overflow": REGISTRY.gauge(
+        "db_pool_overflow", "Connections open beyond pool_size"),
+    "saturation": REGISTRY.gauge(
+        "db_pool_saturation",
+        "Checked-out connections / (pool_size + max_overflow); 1 means new checkouts wait"),
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def pool_stats(pool) -> dict | None:
+    if not isinstance(pool, QueuePool):
+        return None  # StaticPool / SingletonThreadPool: nothing to saturate
+    size, checked_out = pool.size(), pool.checkedout()
+    # _max_overflow has no public accessor; -1 means unbounded
+    capacity = size + pool._max_overflow if pool._max_overflow >= 0 else None
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": checked_out / capacity if capacity else 0.0,
+    }
+
+
+@REGISTRY.collector
+def _collect_pool():
+    stats = pool_stats(db.engine.pool)
+    for key, value in (stats or {}).items():
+        POOL_GAUGES[key].set(value)
+
+
+# --- token cache ----------------------------------------------------------
+
+TOKEN_CACHE_LOOKUPS = REGISTRY.counter(
+    "token_cache_lookups_total", "Verified-token cache lookups", ("result",))
+TOKEN_CACHE_GAUGES = {
+    "size": REGISTRY.gauge("token_cache_size", "Tokens currently cached"),
+    "maxsize": REGISTRY.gauge("token_cache_capacity", "JWT_CACHE_SIZE"),
+}
+
+
+@REGISTRY.collector
+def _collect_token_cache():
+    cache = current_app.extensions.get("token_cache")
+    if cache is None:
+        return
+    stats = cache.stats()
+    TOKEN_CACHE_LOOKUPS.mirror(stats["hits"], result="hit")
+    TOKEN_CACHE_LOOKUPS.mirror(stats["misses"], result="miss")
+    for key, gauge in TOKEN_CACHE_GAUGES.items():
+        gauge.set(stats[key])
+
+
+# --- per-request timings ---------------------------------------------------
+
+_REQUEST_LABELS = ("blueprint", "route", "method")
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Requests handled", (*_REQUEST_LABELS, "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from routing to teardown", _REQUEST_LABELS)
+REQUEST_STATEMENTS = REGISTRY.histogram(
+    "http_request_db_statements", "SQL statements executed per request",
+    _REQUEST_LABELS, buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250))
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request",
+    _REQUEST_LABELS)
+REQUEST_SERIALIZE_SECONDS = REGISTRY.histogram(
+    "http_request_serialization_seconds",
+    "Time spent turning models into dicts and dicts into JSON per request",
+    _REQUEST_LABELS)
+
+
+class RequestStats:
+    __slots__ = ("start", "status", "statements", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.status = 500  # until after_request says otherwise
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def current_stats() -> RequestStats | None:
+    """The running request's stats, or None outside an instrumented request."""
+    return g.get("_request_stats") if has_app_context() else None
+
+
+# The start time lives on the execution context, not conn.info: one
+# connection can run interleaved statements (StaticPool shares it across
+# threads), and each statement has its own context.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    start = getattr(context, "_metrics_start", None)
+    if stats is not None and start is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def timed_serializer(fn):
+    """Wrap a dump_* function so its time counts toward serialization."""
+    @wraps(fn)
+    def serialize(*args, **kwargs):
+        stats = current_stats()
+        if stats is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.serialize_seconds += time.perf_counter() - start
+    return serialize
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """app.json provider that counts encoding time toward serialization."""
+    dumps = timed_serializer(DefaultJSONProvider.dumps)
+
+
+_label_keys = {}  # (endpoint, rule, method) -> label values
+# The method comes from the client; anything else is "other", so label
+# sets stay bounded (like "unmatched" for routes).
+_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+def _request_key(app) -> tuple:
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    method = request.method if request.method in _METHODS else "other"
+    cache_key = (request.endpoint, rule, method)
+    key = _label_keys.get(cache_key)
+    if key is None:
+        # Blueprints are labelled by package (user, service_ticket, ...).
+        bp = app.blueprints.get(request.blueprint) if request.blueprint else None
+        key = _label_keys[cache_key] = (
+            bp.import_name.rsplit(".", 1)[-1] if bp else "app", rule, method)
+    return key
+
+
+def _start_request():
+    g._request_stats = RequestStats()
+
+
+def _record_status(response):
+    stats = current_stats()
+    if stats is not None:
+        stats.status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    stats = g.pop("_request_stats", None)
+    if stats is None:
+        return
+    key = _request_key(current_app)
+    REQUESTS._inc((*key, str(stats.status)))
+    REQUEST_SECONDS._observe(key, time.perf_counter() - stats.start)
+    REQUEST_STATEMENTS._observe(key, stats.statements)
+    REQUEST_DB_SECONDS._observe(key, stats.db_seconds)
+    REQUEST_SERIALIZE_SECONDS._observe(key, stats.serialize_seconds)
+
+
+# --- endpoint --------------------------------------------------------------
+
+@limiter.exempt
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token and current_app.config.get("METRICS_REQUIRE_TOKEN"):
+        return jsonify({"error": "Set METRICS_TOKEN to enable /metrics"}), 403
+    if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def init_metrics(app) -> None:
+    """
+    Swap in TimedQueuePool when the config sizes a pool, mount GET
+    /metrics and, unless METRICS_ENABLED is off, install the per-request
+    hooks. Call before db.init_app so the engine picks up the pool class.
+    """
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    if "pool_size" in options and "poolclass" not in options:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**options, "poolclass": TimedQueuePool}
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    # Outside a request these cost one attribute write and one g lookup.
+    if not event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
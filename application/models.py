@@ -1,12 +1,21 @@
 from application.extensions import db
 from datetime import datetime
 
+
+def version_column():
+    # Row version: the source of ETags, and the optimistic-concurrency
+    # check for ORM updates (mapped as version_id_col, so every UPDATE
+    # carries "WHERE version = <loaded version>" and bumps it).
+    return db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
 ticket_mechanics = db.Table(
     "ticket_mechanics",
     db.Column("ticket_id", db.Integer, db.ForeignKey(
         "service_ticket.id"), primary_key=True),
     db.Column("mechanic_id", db.Integer, db.ForeignKey(
         "mechanic.id"), primary_key=True),
+    # The primary key leads with ticket_id; this serves "tickets of mechanic X".
+    db.Index("ix_ticket_mechanics_mechanic_id_ticket_id", "mechanic_id", "ticket_id"),
 )
 
 ticket_parts = db.Table(
@@ -15,32 +24,69 @@ ticket_parts = db.Table(
         "service_ticket.id"), primary_key=True),
     db.Column("inventory_id", db.Integer, db.ForeignKey(
         "inventory.id"), primary_key=True),
+    db.Column("attached_at", db.DateTime, nullable=False,
+              server_default=db.func.current_timestamp()),
+    db.Index("ix_ticket_parts_inventory_id_ticket_id", "inventory_id", "ticket_id"),
+)
+
+# Materialized per-part, per-day attachment counts (application/part_usage.py):
+# uses = rows in ticket_parts for inventory_id whose attached_at falls on day.
+part_usage = db.Table(
+    "part_usage",
+    db.Column("inventory_id", db.Integer, db.ForeignKey(
+        "inventory.id"), primary_key=True),
+    db.Column("day", db.Date, primary_key=True),
+    db.Column("uses", db.Integer, nullable=False),
+    # Window scans (GET /inventory/usage) read only this index.
+    db.Index("ix_part_usage_day_inventory_id", "day", "inventory_id", "uses"),
 )
 
 
 class User(db.Model):
     __tablename__ = "user"
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=True)      # <-- add this
+    name = db.Column(db.String(120), nullable=True, index=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = version_column()
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Mechanic(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
+    version = version_column()
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Inventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
+    # Units in stock; NULL means stock isn't tracked for this part.
+    # Attaching the part to a ticket takes one unit (see _take_stock in
+    # the service_ticket blueprint).
+    quantity = db.Column(db.Integer, nullable=True)
+    version = version_column()
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (
+        db.CheckConstraint("quantity >= 0", name="ck_inventory_quantity_nonnegative"),
+    )
 
 
 class ServiceTicket(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(500), nullable=False)
     status = db.Column(db.String(20), default="open")
+    version = version_column()
+    __mapper_args__ = {"version_id_col": version}
+    # (filter column, id): GET /tickets/ filters, then pages by id, from
+    # one index range.
+    __table_args__ = (
+        db.Index("ix_service_ticket_status_id", "status", "id"),
+        db.Index("ix_service_ticket_user_id_id", "user_id", "id"),
+        db.Index("ix_service_ticket_primary_mechanic_id_id", "primary_mechanic_id", "id"),
+    )
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     primary_mechanic_id = db.Column(
@@ -48,7 +94,12 @@ class ServiceTicket(db.Model):
 
     primary_mechanic = db.relationship(
         "Mechanic", backref="primary_for", foreign_keys=[primary_mechanic_id])
+    # Collections load lazily; routes pick a strategy per query with
+    # selectinload/joinedload. passive_deletes: delete_ticket clears the
+    # association rows itself instead of loading both collections first.
     mechanics = db.relationship(
-        "Mechanic", secondary=ticket_mechanics, backref="tickets", lazy="joined")
+        "Mechanic", secondary=ticket_mechanics, backref="tickets",
+        passive_deletes=True)
     parts = db.relationship(
-        "Inventory", secondary=ticket_parts, backref="tickets", lazy="joined")
+        "Inventory", secondary=ticket_parts, backref="tickets",
+        passive_deletes=True)
@@ -0,0 +1,158 @@
+import base64
+import json
+
+from flask import request, current_app
+from sqlalchemy import asc, desc, tuple_
+
+
+class PaginationError(ValueError):
+    """Raised when `limit`, `after` or `sort` query params can't be used."""
+
+
+# Bounds of a signed 64-bit integer: the widest value drivers will bind.
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def is_db_int(value) -> bool:
+    """True for a JSON integer (not a bool) that fits in 64 bits."""
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and INT64_MIN <= value <= INT64_MAX)
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise PaginationError("invalid cursor")
+    if not isinstance(payload, dict):
+        raise PaginationError("invalid cursor")
+    return payload
+
+
+def page_limit() -> int:
+    """Read `?limit=` and clamp it to PAGE_SIZE_MAX."""
+    default = current_app.config["PAGE_SIZE_DEFAULT"]
+    maximum = current_app.config["PAGE_SIZE_MAX"]
+    raw = request.args.get("limit")
+    if raw is None or raw == "":
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be positive")
+    return min(limit, maximum)
+
+
+def int_arg(name: str) -> int | None:
+    """Read an optional integer query param (filters like `?user_id=`)."""
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise PaginationError(f"{name} must be an integer")
+    if not is_db_int(value):
+        raise PaginationError(f"{name} is out of range")
+    return value
+
+
+def name_prefix_filter(query, column, param="name"):
+    """
+    Apply `?name=<prefix>` as a range predicate (col >= p AND col < p+1)
+    rather than LIKE, so every backend can answer it from a B-tree index.
+    """
+    prefix = request.args.get(param)
+    if not prefix:
+        return query
+    query = query.filter(column >= prefix)
+    last = ord(prefix[-1])
+    if last < 0x10FFFF:
+        query = query.filter(column < prefix[:-1] + chr(last + 1))
+    return query
+
+
+def _cursor_value_ok(column, value) -> bool:
+    """Whether a cursor's `v` is a scalar the sort column can compare to."""
+    if value is None:
+        return True
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:  # untyped, like the search rank: a number
+        expected = float
+    if expected is str:
+        return isinstance(value, str)
+    if expected is int:
+        return is_db_int(value)
+    return expected is float and (isinstance(value, float) or is_db_int(value))
+
+
+def keyset_window(query, id_col, sortable=None, default_sort="-id"):
+    """
+    The part of keyset_page that doesn't run anything: reads `?limit=`,
+    `?after=` and `?sort=` and returns (query, limit, sort_col), with
+    query ordered and filtered to the rows after the cursor.
+    """
+    columns = {"id": id_col, **(sortable or {})}
+    sort = request.args.get("sort") or default_sort
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in columns:
+        raise PaginationError(
+            "sort must be one of: " + ", ".join(sorted(columns)))
+    sort_col = columns[key]
+    limit = page_limit()
+
+    after = request.args.get("after")
+    if after:
+        payload = decode_cursor(after)
+        last_id = payload.get("id")
+        if not is_db_int(last_id) or payload.get("s", "-id") != sort:
+            raise PaginationError("invalid cursor")
+        if sort_col is id_col:
+            query = query.filter(
+                id_col < last_id if descending else id_col > last_id)
+        else:
+            last_value = payload.get("v")
+            if not _cursor_value_ok(sort_col, last_value):
+                raise PaginationError("invalid cursor")
+            current = tuple_(sort_col, id_col)
+            last = tuple_(last_value, last_id)
+            query = query.filter(current < last if descending else current > last)
+
+    direction = desc if descending else asc
+    order = [direction(id_col)] if sort_col is id_col \
+        else [direction(sort_col), direction(id_col)]
+    return query.order_by(*order), limit, sort_col
+
+
+def keyset_page(query, id_col, sortable=None, default_sort="-id"):
+    """
+    Keyset pagination. Reads `?limit=`, `?after=` and `?sort=` from the
+    request and returns (rows, next_cursor); next_cursor is None on the
+    last page.
+
+    `sortable` maps extra sort names to non-null columns. `?sort=name`
+    sorts ascending, `?sort=-name` descending; id breaks ties. The
+    default is `default_sort` (`-id`, newest first, unless given).
+    """
+    query, limit, sort_col = keyset_window(query, id_col, sortable, default_sort)
+    # Fetch one extra row to learn whether another page exists.
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        payload = {"s": request.args.get("sort") or default_sort,
+                   "id": getattr(rows[-1], id_col.key)}
+        if sort_col is not id_col:
+            payload["v"] = getattr(rows[-1], sort_col.key)
+        next_cursor = encode_cursor(payload)
+    return rows, next_cursor
@@ -0,0 +1,113 @@
+"""
+Per-part usage counters for purchasing (GET /inventory/usage).
+
+part_usage holds, for each part and UTC day, how many ticket_parts rows
+with that attached_at day exist. Every path that adds or removes
+ticket_parts rows calls count_links / uncount_links in the same
+transaction, so the counters commit or roll back with the links. Each
+call is one INSERT ... SELECT ... GROUP BY upsert over the affected links
+of one ticket; nothing is read back into Python.
+
+rebuild() recomputes the table from ticket_parts, one chunk of parts per
+transaction (`flask inventory rebuild-usage`).
+"""
+from sqlalchemy import Date, delete, func, select, type_coerce
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from application.bulk import chunked
+from application.extensions import db
+from application.models import Inventory, part_usage, ticket_parts
+
+_day = type_coerce(func.date(ticket_parts.c.attached_at), Date)
+
+
+def _upsert_from(select_stmt):
+    """INSERT select_stmt's (inventory_id, day, uses) rows, adding to existing counters."""
+    name = db.session.get_bind().dialect.name
+    columns = ["inventory_id", "day", "uses"]
+    if name == "mysql":
+        stmt = mysql.insert(part_usage).from_select(columns, select_stmt)
+        return stmt.on_duplicate_key_update(uses=part_usage.c.uses + stmt.inserted.uses)
+    dialect = postgresql if name == "postgresql" else sqlite
+    stmt = dialect.insert(part_usage).from_select(columns, select_stmt)
+    return stmt.on_conflict_do_update(
+        index_elements=["inventory_id", "day"],
+        set_={"uses": part_usage.c.uses + stmt.excluded.uses})
+
+
+def _apply(tid, sign, inventory_ids):
+    def links(*where):
+        return select(ticket_parts.c.inventory_id, _day, sign * func.count()) \
+            .where(ticket_parts.c.ticket_id == tid, *where) \
+            .group_by(ticket_parts.c.inventory_id, _day)
+    if inventory_ids is None:
+        db.session.execute(_upsert_from(links()))
+        return
+    for chunk in chunked(inventory_ids):
+        db.session.execute(_upsert_from(
+            links(ticket_parts.c.inventory_id.in_(chunk))))
+
+
+def count_links(tid, inventory_ids) -> None:
+    """Count ticket `tid`'s links to inventory_ids. Call after inserting them."""
+    if inventory_ids:
+        _apply(tid, 1, inventory_ids)
+
+
+def uncount_links(tid, inventory_ids=None) -> None:
+    """Uncount links (all of them if inventory_ids is None). Call before deleting them."""
+    if inventory_ids is None or inventory_ids:
+        _apply(tid, -1, inventory_ids)
+
+
+def usage_totals(since, until, top: int):
+    """The `top` parts by uses on days in [since, until], most used first."""
+    total = func.sum(part_usage.c.uses).label("uses")
+    return db.session.execute(
+        select(part_usage.c.inventory_id, Inventory.name, total)
+        .join(Inventory, Inventory.id == part_usage.c.inventory_id)
+        .where(part_usage.c.day.between(since, until))
+        .group_by(part_usage.c.inventory_id, Inventory.name)
+        .having(total > 0)
+        .order_by(total.desc(), part_usage.c.inventory_id)
+        .limit(top)).all()
+
+
+def usage_days(inventory_ids, since, until):
+    """(inventory_id, day, uses) rows for inventory_ids on days in [since, until]."""
+    return db.session.execute(
+        select(part_usage.c.inventory_id, part_usage.c.day, part_usage.c.uses)
+        .where(part_usage.c.inventory_id.in_(inventory_ids),
+               part_usage.c.day.between(since, until),
+               part_usage.c.uses != 0)).all()
+
+
+def rebuild(chunk_size: int = 500) -> int:
+    """
+    Recompute part_usage from ticket_parts, committing after each chunk of
+    `chunk_size` parts (a delete and one grouped INSERT ... SELECT by
+    inventory_id range). Returns the number of parts processed.
+    """
+    done, last = 0, 0
+    while True:
+        ids = db.session.scalars(
+            select(Inventory.id).where(Inventory.id > last)
+            .order_by(Inventory.id).limit(chunk_size)).all()
+        if not ids:
+            break
+        first, last = last, ids[-1]
+        db.session.execute(delete(part_usage).where(
+            part_usage.c.inventory_id > first, part_usage.c.inventory_id <= last))
+        # reads ix_ticket_parts_inventory_id_ticket_id by range
+        db.session.execute(part_usage.insert().from_select(
+            ["inventory_id", "day", "uses"],
+            select(ticket_parts.c.inventory_id, _day, func.count())
+            .where(ticket_parts.c.inventory_id > first,
+                   ticket_parts.c.inventory_id <= last)
+            .group_by(ticket_parts.c.inventory_id, _day)))
+        db.session.commit()
+        done += len(ids)
+    # counters for parts deleted without going through delete_part
+    db.session.execute(delete(part_usage).where(part_usage.c.inventory_id > last))
+    db.session.commit()
+    return done
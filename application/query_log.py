@@ -0,0 +1,92 @@
+"""
+Per-request SQL recording for development and tests (SQL_RECORD).
+
+Every statement a request runs is kept with its parameters and duration.
+Statements slower than SQL_SLOW_QUERY_MS are logged as they finish, with
+the route that ran them. At teardown, a statement run more than
+SQL_REPEAT_THRESHOLD times with different parameters is logged as a likely
+N+1. Each finished request is announced on `request_queries`, which
+DBTestCase.query_budget listens to.
+"""
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+from blinker import Namespace
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+request_queries = Namespace().signal("request-queries")
+
+
+class RecordedQuery(NamedTuple):
+    statement: str
+    parameters: object
+    seconds: float
+
+
+def _recording() -> list | None:
+    return g.get("_sql_queries") if has_app_context() else None
+
+
+def _route() -> str:
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return f"{request.method} {rule}"
+
+
+def repeated_statements(queries, threshold: int) -> dict:
+    """Statements run more than `threshold` times with differing parameters."""
+    runs = defaultdict(int)
+    params = defaultdict(set)
+    for q in queries:
+        runs[q.statement] += 1
+        params[q.statement].add(repr(q.parameters))
+    return {stmt: n for stmt, n in runs.items()
+            if n > threshold and len(params[stmt]) > 1}
+
+
+# Timed on the execution context, as in application.metrics: conn.info is
+# shared by every statement interleaved on one connection.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _recording() is not None:
+        context._sql_record_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _recording()
+    start = getattr(context, "_sql_record_start", None)
+    if queries is None or start is None:
+        return
+    seconds = time.perf_counter() - start
+    queries.append(RecordedQuery(statement, parameters, seconds))
+    if seconds * 1000 >= current_app.config["SQL_SLOW_QUERY_MS"]:
+        # parameters left out: they can hold password hashes and tokens
+        current_app.logger.warning(
+            "slow query (%.1f ms) in %s: %s", seconds * 1000, _route(), statement)
+
+
+def _start_request():
+    g._sql_queries = []
+
+
+def _finish_request(exc):
+    queries = g.pop("_sql_queries", None)
+    if queries is None:
+        return
+    route = _route()
+    threshold = current_app.config["SQL_REPEAT_THRESHOLD"]
+    for statement, count in repeated_statements(queries, threshold).items():
+        current_app.logger.warning(
+            "possible N+1 in %s: %d runs of %s", route, count, statement)
+    request_queries.send(current_app._get_current_object(), route=route, queries=queries)
+
+
+def init_query_log(app) -> None:
+    if not app.config.get("SQL_RECORD"):
+        return
+    app.before_request(_start_request)
+    app.teardown_request(_finish_request)
+    if not event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,45 @@
+"""
+Who a request counts against, and how much it costs.
+
+Authenticated requests are keyed on the token's subject, so terminals
+behind one NAT get separate budgets; anonymous ones fall back to the
+client IP (made proxy-aware by ProxyFix, see PROXY_FIX_X_FOR). Default
+limits come from RATELIMIT_ROLE_LIMITS by the token's role, and read-heavy
+endpoints spend more of that budget per call the more rows they return.
+"""
+from flask import current_app
+from flask_limiter.util import get_remote_address
+
+from application.pagination import PaginationError, page_limit
+from application.util import request_claims
+
+
+def rate_limit_key() -> str:
+    claims = request_claims()
+    if claims is not None and claims.get("sub") is not None:
+        return f"user:{claims['sub']}"
+    return f"ip:{get_remote_address()}"
+
+
+def current_role() -> str:
+    claims = request_claims()
+    return "anonymous" if claims is None else claims.get("role", "user")
+
+
+def role_limit() -> str:
+    limits = current_app.config["RATELIMIT_ROLE_LIMITS"]
+    return limits.get(current_role(), limits["user"])
+
+
+def page_cost() -> int:
+    """One unit per RATELIMIT_PAGE_COST_UNIT rows requested (rounded up)."""
+    try:
+        rows = page_limit()
+    except PaginationError:
+        return 1  # the view answers 400 without reading anything
+    unit = current_app.config["RATELIMIT_PAGE_COST_UNIT"]
+    return max(1, -(-rows // unit))
+
+
+def export_cost() -> int:
+    return current_app.config["RATELIMIT_EXPORT_COST"]
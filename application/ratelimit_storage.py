@@ -0,0 +1,141 @@
+"""
+Rate-limit counters in a local SQLite file, shared by every worker process
+on the host without an external service.
+
+Importing this module registers the ``sqlite`` scheme with `limits`, so
+RATELIMIT_STORAGE_URI = "sqlite:////var/run/mechanic-shop/ratelimit.db"
+selects it. The file runs in WAL mode; each check is a single short write
+transaction. Supports the fixed-window and sliding-window-counter
+strategies. Sliding-window-counter keeps two counters per key, so storage
+stays bounded no matter how large the limit is; expired rows are purged
+as writes come in.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratelimit_counters (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Reset an expired counter in place instead of adding to it.
+_INCR = """
+INSERT INTO ratelimit_counters (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    count = CASE WHEN expires_at <= :now THEN :amount ELSE count + :amount END,
+    expires_at = CASE WHEN expires_at <= :now THEN :expires_at ELSE expires_at END
+RETURNING count
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlite"]
+    # Purge expired counters once every this many writes.
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self.timeout = float(options.get("timeout", 5))
+        self._local = threading.local()
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().execute(_SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork (gunicorn --preload).
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _incr(self, conn, key: str, expiry: float, amount: int, now: float) -> int:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM ratelimit_counters WHERE expires_at <= ?", (now,))
+        return conn.execute(_INCR, {"key": key, "amount": amount,
+                                    "expires_at": now + expiry, "now": now}).fetchone()[0]
+
+    def _get(self, conn, key: str, now: float) -> tuple[int, float]:
+        row = conn.execute(
+            "SELECT count, expires_at FROM ratelimit_counters "
+            "WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return row if row else (0, now)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self._incr(self._connection(), key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        return self._get(self._connection(), key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        return self._get(self._connection(), key, time.time())[1]
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        return self._connection().execute("DELETE FROM ratelimit_counters").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM ratelimit_counters WHERE key = ?", (key,))
+
+    # --- sliding window counter ---------------------------------------------
+
+    def _window(self, conn, key: str, expiry: int, now: float):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)[0]
+        current_count = self._get(conn, current_key, now)[0]
+        # same weighting as limits' MemoryStorage
+        previous_ttl = 0.0 if previous_count == 0 else (
+            1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, (previous_count, previous_ttl, current_count, current_ttl)
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int,
+                                     amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        conn = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so the read and the
+        # increment are atomic across processes; no over-admit and retry.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current_key, (prev, prev_ttl, current, _) = self._window(conn, key, expiry, now)
+            if math.floor(prev * prev_ttl / expiry + current) + amount > limit:
+                conn.execute("ROLLBACK")
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        return self._window(self._connection(), key, expiry, time.time())[1]
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for k in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(k)
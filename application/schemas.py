@@ -1,4 +1,7 @@
+from marshmallow import fields
+
 from application.extensions import ma
+from application.metrics import timed_serializer
 from application.models import User, Mechanic, Inventory, ServiceTicket
 
 
@@ -24,6 +27,7 @@ class InventorySchema(ma.SQLAlchemySchema):
         load_instance = True
     id = ma.auto_field()
     name = ma.auto_field()
+    quantity = ma.auto_field()
 
 
 class TicketSchema(ma.SQLAlchemySchema):
@@ -49,3 +53,50 @@ inventories_schema = InventorySchema(many=True)
 
 ticket_schema = TicketSchema()
 tickets_schema = TicketSchema(many=True)
+
+
+# --- Fast-path serializers -------------------------------------------------
+# marshmallow stays the source of truth for field names; these are compiled
+# once at import time from each schema's dump_fields and return the same
+# dicts as `schema.dump(obj)` without marshmallow's per-field dispatch.
+
+_PASSTHROUGH = (fields.Integer, fields.String)
+
+
+def compile_serializer(schema):
+    """Build a plain function equivalent to `schema.dump(obj)`."""
+    namespace = {}
+    items = []
+    for i, (key, field) in enumerate(schema.dump_fields.items()):
+        attr = field.attribute or key
+        if type(field) in _PASSTHROUGH:
+            expr = f"obj.{attr}"
+        elif isinstance(field, fields.List) and isinstance(field.inner, fields.Nested):
+            namespace[f"_inner{i}"] = compile_serializer(field.inner.schema)
+            expr = f"[_inner{i}(v) for v in obj.{attr}]"
+        else:
+            namespace[f"_field{i}"] = field
+            expr = f"_field{i}.serialize({attr!r}, obj)"
+        items.append(f"{key!r}: {expr}")
+    source = "def serialize(obj):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(source, f"<serializer {type(schema).__name__}>", "exec"), namespace)
+    return namespace["serialize"]
+
+
+def _many(serialize):
+    def serialize_many(objs):
+        return [serialize(obj) for obj in objs]
+    return serialize_many
+
+
+def _exported(schema):
+    # (one, many) pair; each call's time counts toward the request's
+    # serialization metric, without timing every item of a list.
+    serialize = compile_serializer(schema)
+    return timed_serializer(serialize), timed_serializer(_many(serialize))
+
+
+dump_user, dump_users = _exported(user_schema)
+dump_mechanic, dump_mechanics = _exported(mechanic_schema)
+dump_inventory, dump_inventories = _exported(inventory_schema)
+dump_ticket, dump_tickets = _exported(ticket_schema)
@@ -0,0 +1,115 @@
+"""
+Full-text search over ServiceTicket.description.
+
+SQLite gets an FTS5 external-content table (service_ticket_fts) that
+triggers keep in step with every insert, update and delete on
+service_ticket, ORM or Core. Postgres gets a GIN index over
+to_tsvector('english', description) and MySQL a FULLTEXT index, both
+maintained by the server. The objects are created and dropped with the
+service_ticket table (db.create_all) and by migration 5d9a3f1c7b62 on
+existing databases.
+"""
+import re
+
+from sqlalchemy import (
+    DDL, Float, column, event, func, literal, literal_column, select, table, type_coerce)
+from sqlalchemy.dialects import mysql
+
+from application.models import ServiceTicket
+
+FTS_TABLE = "service_ticket_fts"
+FTS_INDEX = "ix_service_ticket_description_fts"
+
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='service_ticket', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_ai AFTER INSERT ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_ad AFTER DELETE ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    # only description changes touch the index (not version/status bumps)
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_au AFTER UPDATE OF description "
+    f"ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+)
+POSTGRES_DDL = (
+    f"CREATE INDEX IF NOT EXISTS {FTS_INDEX} ON service_ticket "
+    "USING gin (to_tsvector('english', description))",
+)
+MYSQL_DDL = (
+    f"CREATE FULLTEXT INDEX {FTS_INDEX} ON service_ticket (description)",
+)
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+def is_search_object(name: str, type_: str) -> bool:
+    """
+    Whether a reflected table or index belongs to the search index: the
+    FTS5 table with its shadow tables, or the GIN/FULLTEXT index. They're
+    created outside the models, so autogenerate must leave them alone.
+    """
+    if type_ == "table":
+        return name == FTS_TABLE or name.startswith(FTS_TABLE + "_")
+    return type_ == "index" and name == FTS_INDEX
+
+
+def _ddl():
+    for dialect, statements in (("sqlite", SQLITE_DDL), ("postgresql", POSTGRES_DDL),
+                                ("mysql", MYSQL_DDL)):
+        for statement in statements:
+            yield DDL(statement).execute_if(dialect=dialect)
+
+
+def init_ticket_search() -> None:
+    """Create/drop the search index with the service_ticket table."""
+    tickets = ServiceTicket.__table__
+    if tickets.info.get("search_ddl"):
+        return
+    tickets.info["search_ddl"] = True
+    for ddl in _ddl():
+        event.listen(tickets, "after_create", ddl)
+    # the FTS table outlives DROP TABLE service_ticket otherwise
+    event.listen(tickets, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+
+def search_terms(q: str) -> list[str]:
+    """Words in `q`; punctuation and search operators are dropped."""
+    return re.findall(r"\w+", q)
+
+
+def ranked_matches(dialect: str, terms: list[str]):
+    """
+    (id, rank) for every ticket whose description contains all `terms`,
+    as a subquery. Lower rank is a better match on every backend; other
+    dialects fall back to an unranked LIKE scan.
+    """
+    if dialect == "sqlite":
+        # Quoted terms: FTS5 treats bare words like AND/NEAR/"-" as syntax.
+        query = " ".join('"%s"' % t for t in terms)
+        fts = literal_column(FTS_TABLE)
+        stmt = (select(_fts.c.rowid.label("id"), func.bm25(fts).label("rank"))
+                .where(fts.op("MATCH")(query)))
+    elif dialect == "postgresql":
+        # literal config, or the planner won't match the expression index
+        english = literal_column("'english'")
+        vector = func.to_tsvector(english, ServiceTicket.description)
+        tsquery = func.plainto_tsquery(english, " ".join(terms))
+        stmt = (select(ServiceTicket.id, (-func.ts_rank(vector, tsquery)).label("rank"))
+                .where(vector.op("@@")(tsquery)))
+    elif dialect == "mysql":
+        relevance = type_coerce(mysql.match(
+            ServiceTicket.description,
+            against=" ".join("+%s" % t for t in terms)).in_boolean_mode(), Float)
+        stmt = (select(ServiceTicket.id, (-relevance).label("rank"))
+                .where(relevance > 0))
+    else:
+        # No index here: a LIKE scan per word, every match ranked equal.
+        stmt = (select(ServiceTicket.id, literal(0.0, Float).label("rank"))
+                .where(*(ServiceTicket.description.contains(t, autoescape=True)
+                         for t in terms)))
+    return stmt.subquery("matches")
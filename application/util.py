@@ -1,29 +1,144 @@
-from functools import wraps
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps, lru_cache
+from datetime import datetime, timedelta, timezone
+import threading
+import time
 import jwt
 from flask import request, jsonify, current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+JWT_ALGORITHM = "HS256"
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token -> claims. An entry is only served until
+    the token's own `exp`, so caching never extends a token's lifetime.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (exp, claims)
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[token] = (exp, claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def init_token_cache(app) -> None:
+    app.extensions["token_cache"] = TokenCache(app.config["JWT_CACHE_SIZE"])
 
 
 def make_token(user_id: int, role: str = "user") -> str:
     payload = {
         "sub": user_id,
         "role": role,
-        "exp": datetime.utcnow() + timedelta(hours=1)
+        "exp": datetime.now(timezone.utc) + timedelta(hours=1)
     }
-    return jwt.encode(payload, current_app.config["SECRET_KEY"], algorithm="HS256")
+    return jwt.encode(payload, current_app.config["SECRET_KEY"], algorithm=JWT_ALGORITHM)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a token issued by make_token and return its claims.
+    Raises jwt.InvalidTokenError if it is malformed, forged or expired.
+    """
+    cache = current_app.extensions["token_cache"]
+    claims = cache.get(token)
+    if claims is None:
+        claims = jwt.decode(
+            token, current_app.config["SECRET_KEY"], algorithms=[JWT_ALGORITHM])
+        cache.put(token, claims)
+    return claims
+
+
+def init_password_hasher(app) -> None:
+    # Hashing is CPU-bound and pbkdf2/scrypt release the GIL, so a small
+    # dedicated pool caps how many cores a login storm can take while the
+    # worker's other threads keep serving requests.
+    app.extensions["password_pool"] = ThreadPoolExecutor(
+        max_workers=app.config["PASSWORD_HASH_WORKERS"],
+        thread_name_prefix="password-hash")
+
+
+@lru_cache(maxsize=8)
+def _hash_prefix(method: str) -> str:
+    # werkzeug expands e.g. "scrypt" to "scrypt:32768:8:1" in the stored
+    # hash; hash once to learn the canonical prefix for this method.
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def _run_hasher(fn, *args):
+    """Run fn in the password pool; TimeoutError if it is saturated."""
+    future = current_app.extensions["password_pool"].submit(fn, *args)
+    try:
+        return future.result(timeout=current_app.config["PASSWORD_HASH_TIMEOUT"])
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def hash_password(password: str) -> str:
+    return _run_hasher(
+        generate_password_hash, password,
+        current_app.config["PASSWORD_HASH_METHOD"],
+        current_app.config["PASSWORD_SALT_LENGTH"])
+
+
+def verify_password(stored_hash: str, password: str) -> tuple[bool, bool]:
+    """
+    Check a password against its stored hash. Returns (ok, needs_rehash);
+    needs_rehash is True when the hash was made with a method or cost other
+    than PASSWORD_HASH_METHOD.
+    """
+    ok = _run_hasher(check_password_hash, stored_hash, password)
+    method = current_app.config["PASSWORD_HASH_METHOD"]
+    return ok, ok and stored_hash.split("$", 1)[0] != _hash_prefix(method)
+
+
+def request_claims() -> dict | None:
+    """Claims of the request's bearer token; None if it has none or it's invalid."""
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    try:
+        return decode_token(auth.split(" ", 1)[1])
+    except jwt.InvalidTokenError:
+        return None
 
 
 def token_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        auth = request.headers.get("Authorization", "")
-        if not auth.startswith("Bearer "):
-            return jsonify({"error": "Unauthorized"}), 401
-        token = auth.split(" ", 1)[1]
-        try:
-            data = jwt.decode(
-                token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-        except Exception:
+        data = request_claims()
+        if data is None:
             return jsonify({"error": "Unauthorized"}), 401
         kwargs["user_id"] = data.get("sub")
         kwargs["role"] = data.get("role", "user")
@@ -0,0 +1,69 @@
+"""
+PUT /tickets/<id>/edit on a ticket with hundreds of assigned mechanics,
+against the previous ORM collection rewrite.
+
+    python -m benchmarks.bench_edit_mechanics [assigned] [rounds]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.models import Mechanic, ServiceTicket  # noqa: E402
+from application.util import make_token  # noqa: E402
+
+
+def orm_rewrite(tid, add_ids, remove_ids):
+    # The pre-set-based implementation, kept here as the baseline.
+    t = db.session.get(ServiceTicket, tid)
+    for m in Mechanic.query.filter(Mechanic.id.in_(add_ids)).all():
+        if m not in t.mechanics:
+            t.mechanics.append(m)
+    t.mechanics = [m for m in t.mechanics if m.id not in set(remove_ids)]
+    db.session.commit()
+
+
+def main():
+    assigned = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        mechanics = [Mechanic(name=f"Mechanic {i}") for i in range(assigned + 50)]
+        tickets = [ServiceTicket(description="Fleet service") for _ in range(2)]
+        db.session.add_all(mechanics + tickets)
+        db.session.commit()
+        mids = [m.id for m in mechanics]
+        base, churn = mids[:assigned], mids[assigned:]
+        for t in tickets:
+            t.mechanics = [m for m in mechanics[:assigned]]
+        db.session.commit()
+        orm_tid, sql_tid = tickets[0].id, tickets[1].id
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+        client = app.test_client()
+
+        def run(step):
+            start = time.perf_counter()
+            for i in range(rounds):
+                # alternate adding and removing 50 mechanics
+                add, remove = (churn, []) if i % 2 == 0 else ([], churn)
+                step(add, remove)
+                db.session.remove()
+            return (time.perf_counter() - start) / rounds * 1000
+
+        orm_ms = run(lambda a, r: orm_rewrite(orm_tid, a, r))
+        sql_ms = run(lambda a, r: client.put(
+            f"/tickets/{sql_tid}/edit", json={"add_ids": a, "remove_ids": r},
+            headers=headers))
+        assert len(db.session.get(ServiceTicket, sql_tid).mechanics) == len(base)
+
+    print(f"ticket with {assigned} mechanics, +/-50 per call, {rounds} rounds")
+    print(f"  ORM collection rewrite     : {orm_ms:7.2f} ms/call (no HTTP)")
+    print(f"  set-based endpoint (HTTP)  : {sql_ms:7.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Per-request cost of the /metrics instrumentation, next to the cost of a
+cheap request. End-to-end on/off comparisons drown in run-to-run noise at
+this scale, so the hooks are timed directly: one request's worth of work
+is start + 3 statements + 2 serializer calls + status + finish.
+
+    python -m benchmarks.bench_instrumentation [iterations]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.metrics import (  # noqa: E402
+    _after_cursor_execute, _before_cursor_execute, _finish_request,
+    _record_status, _start_request, timed_serializer)
+from application.models import Inventory  # noqa: E402
+
+
+class FakeConnection:
+    info = {}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        part = Inventory(name="Belt")
+        db.session.add(part)
+        db.session.commit()
+        pid = part.id
+    client = app.test_client()
+    for _ in range(200):  # warm up
+        client.get(f"/inventory/{pid}")
+    start = time.perf_counter()
+    for _ in range(n // 10):
+        client.get(f"/inventory/{pid}")
+    request_us = (time.perf_counter() - start) / (n // 10) * 1e6
+
+    conn, noop = FakeConnection(), timed_serializer(lambda obj: obj)
+    response = app.response_class()
+    with app.test_request_context(f"/inventory/{pid}"):
+        start = time.perf_counter()
+        for _ in range(n):
+            _start_request()
+            for _ in range(3):
+                _before_cursor_execute(conn, None, "", (), None, False)
+                _after_cursor_execute(conn, None, "", (), None, False)
+            noop(1)
+            noop(2)
+            _record_status(response)
+            _finish_request(None)
+        hooks_us = (time.perf_counter() - start) / n * 1e6
+
+    print(f"GET /inventory/<id>, in-memory SQLite : {request_us:7.1f} us/request")
+    print(f"instrumentation hooks                 : {hooks_us:7.1f} us/request "
+          f"({hooks_us / request_us:.1%})")
+
+
+if __name__ == "__main__":
+    main()
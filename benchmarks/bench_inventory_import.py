@@ -0,0 +1,61 @@
+"""
+POST /inventory/import of a large CSV catalog, against inserting the
+same parts one create_part-style commit at a time.
+
+    python -m benchmarks.bench_inventory_import [rows] [baseline_rows]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.models import Inventory  # noqa: E402
+from application.util import make_token  # noqa: E402
+
+
+def per_row(names):
+    # What loading a catalog through POST /inventory/ costs, minus HTTP.
+    for name in names:
+        db.session.add(Inventory(name=name))
+        db.session.commit()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    baseline_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        # every 10th line repeats an earlier part
+        names = [f"Part {i - 1 if i % 10 == 0 else i}" for i in range(rows)]
+        body = ("name\n" + "\n".join(names) + "\n").encode()
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+        client = app.test_client()
+
+        start = time.perf_counter()
+        report = client.post("/inventory/import", data=body,
+                             content_type="text/csv", headers=headers).get_json()
+        import_s = time.perf_counter() - start
+        assert report["inserted"] == db.session.query(Inventory).count()
+        db.session.remove()
+
+        db.session.execute(db.delete(Inventory))
+        db.session.commit()
+        start = time.perf_counter()
+        per_row([f"Part {i}" for i in range(baseline_rows)])
+        per_row_s = (time.perf_counter() - start) / baseline_rows * rows
+
+    chunk = app.config["INVENTORY_IMPORT_CHUNK_SIZE"]
+    print(f"{rows} CSV rows ({report['inserted']} new, {report['duplicates']} repeats), "
+          f"chunks of {chunk}")
+    print(f"  POST /inventory/import (HTTP)   : {import_s:7.2f} s "
+          f"({rows / import_s:,.0f} rows/s)")
+    print(f"  commit per row (extrapolated)   : {per_row_s:7.2f} s "
+          f"(from {baseline_rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
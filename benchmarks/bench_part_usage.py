@@ -0,0 +1,88 @@
+"""
+GET /inventory/usage (part_usage counters) against the same top-N computed
+on demand with a GROUP BY over ticket_parts, on SQLite with 2M links.
+
+    python -m benchmarks.bench_part_usage [links] [rounds]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+os.environ.setdefault("SQL_RECORD", "0")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.models import Inventory, ServiceTicket, ticket_parts  # noqa: E402
+from application.part_usage import rebuild  # noqa: E402
+from application.util import make_token  # noqa: E402
+
+PARTS = 5_000
+PARTS_PER_TICKET = 4
+
+
+def seed(links):
+    rng = random.Random(7)
+    db.session.execute(insert(Inventory), [{"name": f"Part {i}"} for i in range(PARTS)])
+    tickets = links // PARTS_PER_TICKET
+    db.session.execute(insert(ServiceTicket),
+                       [{"description": "job", "status": "open"} for _ in range(tickets)])
+    now = datetime.utcnow()
+    rows = []
+    for tid in range(1, tickets + 1):
+        attached = now - timedelta(days=rng.randrange(365))
+        for pid in rng.sample(range(1, PARTS + 1), PARTS_PER_TICKET):
+            rows.append({"ticket_id": tid, "inventory_id": pid, "attached_at": attached})
+        if len(rows) >= 50_000:
+            db.session.execute(insert(ticket_parts), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(ticket_parts), rows)
+    db.session.commit()
+
+
+def on_demand(since, top=10):
+    total = func.count().label("uses")
+    return db.session.execute(
+        select(ticket_parts.c.inventory_id, total)
+        .where(ticket_parts.c.attached_at >= since)
+        .group_by(ticket_parts.c.inventory_id)
+        .order_by(total.desc()).limit(top)).all()
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        seed(links)
+        start = time.perf_counter()
+        rebuild(chunk_size=500)
+        print(f"{links} links over {PARTS} parts; rebuild-usage took "
+              f"{time.perf_counter() - start:.1f} s")
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+        print(f"  {'window':<10} {'counters':>12} {'on demand':>12}")
+        for days in (30, 365):
+            since = (datetime.utcnow() - timedelta(days=days - 1)).date()
+            counters = timed(lambda: client.get(
+                f"/inventory/usage?since={since}&top=10", headers=headers), rounds)
+            scan = timed(lambda: on_demand(datetime.combine(since, datetime.min.time())),
+                         rounds)
+            print(f"  {days:>4} days  {counters:9.1f} ms {scan:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Login throughput for several PASSWORD_HASH_METHOD settings, with logins
+arriving from concurrent threads the way a threaded worker sees them.
+
+    python -m benchmarks.bench_password_hashing [logins] [threads]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+
+METHODS = [
+    "scrypt:32768:8:1",       # werkzeug default
+    "scrypt:16384:8:1",
+    "pbkdf2:sha256:1000000",
+    "pbkdf2:sha256:600000",
+]
+
+
+def measure(method, logins, threads):
+    app = create_app("testing")
+    app.config["PASSWORD_HASH_METHOD"] = method
+    with app.app_context():
+        db.create_all()
+        app.test_client().post(
+            "/users/", json={"email": "bench@example.com", "password": "pw"})
+
+        def login(_):
+            with app.test_client() as client:
+                res = client.post("/users/login", json={
+                    "email": "bench@example.com", "password": "pw"})
+                assert res.status_code == 200, res.get_data(as_text=True)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        db.drop_all()
+    return logins / elapsed
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{logins} logins from {threads} threads")
+    for method in METHODS:
+        print(f"  {method:24s}: {measure(method, logins, threads):7.1f} logins/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Load test: concurrent GET /tickets/<id> under different pool settings,
+reporting latency percentiles and pool checkout wait.
+
+Each SQL statement sleeps DB_RTT_MS to stand in for a network round trip
+to MySQL/Postgres (SQLite on a local file would never make requests wait).
+
+    python -m benchmarks.bench_pool [threads] [requests_per_thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from application import create_app
+from application.extensions import db
+from application.metrics import POOL_TIMEOUTS, POOL_WAIT
+from application.models import ServiceTicket
+from application.util import make_token
+from config import ProductionConfig
+
+DB_RTT_MS = 2
+SETTINGS = [  # (pool_size, max_overflow)
+    (2, 0),
+    (5, 5),
+    (10, 10),
+    (16, 16),
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(pool_size, max_overflow, threads, per_thread, uri):
+    ProductionConfig.SQLALCHEMY_DATABASE_URI = uri
+    ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS = {
+        **ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS,
+        "pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": 30,
+    }
+    app = create_app("production")
+    with app.app_context():
+        db.create_all()
+        if not db.session.get(ServiceTicket, 1):
+            db.session.add(ServiceTicket(description="Brake job"))
+            db.session.commit()
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a: time.sleep(DB_RTT_MS / 1000))
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+
+    latencies, lock = [], threading.Lock()
+    start_gate = threading.Barrier(threads)
+
+    def worker():
+        client = app.test_client()
+        mine = []
+        start_gate.wait()
+        for _ in range(per_thread):
+            t0 = time.perf_counter()
+            res = client.get("/tickets/1", headers=headers)
+            mine.append(time.perf_counter() - t0)
+            assert res.status_code == 200, res.status_code
+        with lock:
+            latencies.extend(mine)
+
+    _, wait_before, n_before = POOL_WAIT.snapshot()
+    timeouts_before = POOL_TIMEOUTS.value()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    _, wait_after, n_after = POOL_WAIT.snapshot()
+    with app.app_context():
+        db.engine.dispose()
+
+    mean_wait = (wait_after - wait_before) / max(n_after - n_before, 1)
+    print(f"  pool_size={pool_size:<3} max_overflow={max_overflow:<3}"
+          f" p50 {percentile(latencies, 0.50) * 1000:6.1f} ms"
+          f"  p99 {percentile(latencies, 0.99) * 1000:6.1f} ms"
+          f"  mean checkout wait {mean_wait * 1000:6.2f} ms"
+          f"  timeouts {POOL_TIMEOUTS.value() - timeouts_before}")
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ProductionConfig.RATELIMIT_ENABLED = False
+    ProductionConfig.CACHE_TYPE = "NullCache"
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        print(f"{threads} threads x {per_thread} GET /tickets/<id>, "
+              f"{DB_RTT_MS} ms per statement")
+        for size, overflow in SETTINGS:
+            run(size, overflow, threads, per_thread, uri)
+
+
+if __name__ == "__main__":
+    main()
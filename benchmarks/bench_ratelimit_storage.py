@@ -0,0 +1,73 @@
+"""
+Rate-limit check cost per request for each storage backend, and how many
+requests four worker processes let through against one "1000 per minute"
+limit.
+
+    python -m benchmarks.bench_ratelimit_storage [hits]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+import application.ratelimit_storage  # noqa: F401  registers sqlite://
+
+WORKERS = 4
+STRATEGIES = {
+    "fixed-window": FixedWindowRateLimiter,
+    "sliding-window-counter": SlidingWindowCounterRateLimiter,
+}
+
+
+def per_hit_us(uri, strategy, hits):
+    limiter = strategy(storage_from_string(uri))
+    # the app's two default limits, checked for 50 distinct clients
+    items = [parse("200 per hour"), parse("50 per minute")]
+    start = time.perf_counter()
+    for i in range(hits):
+        for item in items:
+            limiter.hit(item, f"10.0.0.{i % 50}", "/tickets/")
+    return (time.perf_counter() - start) / hits * 1e6
+
+
+def worker(uri, allowed):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = parse("1000 per minute")
+    allowed.put(sum(limiter.hit(item, "shop-nat-ip") for _ in range(1000)))
+
+
+def admitted(uri):
+    allowed = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(uri, allowed))
+             for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return sum(allowed.get() for _ in procs)
+
+
+def main():
+    hits = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory://": "memory://",
+            "sqlite (WAL file)": "sqlite:///" + os.path.join(tmp, "limits.db"),
+        }
+        print(f"{hits} requests, two default limits each (us per request)")
+        for name, uri in backends.items():
+            cells = "  ".join(f"{s}: {per_hit_us(uri, cls, hits):6.1f}"
+                              for s, cls in STRATEGIES.items())
+            print(f"  {name:<18} {cells}")
+        print(f"{WORKERS} processes x 1000 requests against 1000 per minute")
+        for name, uri in backends.items():
+            print(f"  {name:<18} admitted {admitted(uri)}")
+
+
+if __name__ == "__main__":
+    main()
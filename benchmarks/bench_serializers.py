@@ -0,0 +1,47 @@
+"""
+Serialize 10k tickets with marshmallow and with the compiled serializers.
+
+    python -m benchmarks.bench_serializers [n_tickets]
+"""
+import sys
+import time
+
+from application.models import Mechanic, Inventory, ServiceTicket
+from application.schemas import tickets_schema, dump_tickets
+
+
+def build_tickets(n):
+    mechanics = [Mechanic(id=i, name=f"Mechanic {i}") for i in range(20)]
+    parts = [Inventory(id=i, name=f"Part {i}") for i in range(50)]
+    tickets = []
+    for i in range(n):
+        t = ServiceTicket(id=i, description=f"Job {i}", status="open",
+                          primary_mechanic_id=i % 20)
+        t.mechanics = mechanics[i % 18:i % 18 + 2]
+        t.parts = parts[i % 45:i % 45 + 5]
+        tickets.append(t)
+    return tickets
+
+
+def timed(fn, rows, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    tickets = build_tickets(n)
+    slow, expected = timed(tickets_schema.dump, tickets)
+    fast, actual = timed(dump_tickets, tickets)
+    assert actual == expected, "compiled serializer output differs"
+    print(f"{n} tickets")
+    print(f"  marshmallow dump : {slow * 1000:8.1f} ms")
+    print(f"  compiled         : {fast * 1000:8.1f} ms  ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+POST /tickets/<id>/add-part/<pid> throughput with many writers on one hot
+part, against a SQLite file. Stock runs out halfway through, so half the
+requests take a unit and half get 409. Compares the conditional UPDATE
+add_part uses with a read-check-write of the same quantity, which is what
+it replaced and oversells.
+
+    python -m benchmarks.bench_stock [requests] [writers...]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from unittest import mock
+
+os.environ.setdefault("SQL_RECORD", "0")
+
+from sqlalchemy import func, insert, select, update  # noqa: E402
+
+from config import TestingConfig  # noqa: E402
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.models import Inventory, ServiceTicket, ticket_parts  # noqa: E402
+from application.util import make_token  # noqa: E402
+
+
+def read_check_write():
+    # SELECT, then UPDATE to the value read: two writers can both see 1.
+    quantity = db.session.scalar(select(Inventory.quantity).where(Inventory.id == 1))
+    if quantity < 1:
+        db.session.rollback()
+        return False
+    db.session.execute(update(Inventory).where(Inventory.id == 1)
+                       .values(quantity=quantity - 1)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    return True
+
+
+def run(app, requests, writers, naive):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Inventory).values(id=1, name="Hot", quantity=requests // 2))
+        db.session.execute(insert(ServiceTicket), [
+            {"description": "Job", "status": "open"} for _ in range(requests)])
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def writer(tids):
+        client = app.test_client()
+        for tid in tids:
+            if naive:
+                with app.app_context():
+                    status = 200 if read_check_write() else 409
+            else:
+                status = client.post(f"/tickets/{tid}/add-part/1", headers=headers).status_code
+            with lock:
+                statuses[status] += 1
+
+    tids = list(range(1, requests + 1))
+    threads = [threading.Thread(target=writer, args=(tids[i::writers],))
+               for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        left = db.session.scalar(select(Inventory.quantity).where(Inventory.id == 1))
+        linked = db.session.scalar(select(func.count()).select_from(ticket_parts))
+    taken = requests // 2 - left
+    return requests / elapsed, statuses, statuses[200] - taken, linked
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    writer_counts = [int(w) for w in sys.argv[2:]] or [1, 4, 16, 32]
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = "sqlite:///" + os.path.join(tmp, "stock.db")
+        # SQLite serializes writers; give queued ones time instead of
+        # "database is locked" at 5 s
+        with mock.patch.multiple(TestingConfig, SQLALCHEMY_DATABASE_URI=uri,
+                                 SQLALCHEMY_ENGINE_OPTIONS={"connect_args": {"timeout": 60}},
+                                 create=True):
+            app = create_app("testing")
+        print(f"{requests} requests, stock {requests // 2}, one part")
+        print(f"  {'writers':>7} {'add-part req/s':>15} {'oversold':>9} "
+              f"{'read-check-write oversold':>26}")
+        for writers in writer_counts:
+            rate, statuses, oversold, linked = run(app, requests, writers, naive=False)
+            assert linked == statuses[200], (linked, statuses)
+            _, _, naive_oversold, _ = run(app, requests, writers, naive=True)
+            print(f"  {writers:>7} {rate:15.0f} {oversold:9d} {naive_oversold:26d}")
+
+
+if __name__ == "__main__":
+    main()
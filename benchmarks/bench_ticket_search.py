@@ -0,0 +1,82 @@
+"""
+GET /tickets/search (FTS5) against a LIKE '%word%' scan, on SQLite with
+1M tickets.
+
+    python -m benchmarks.bench_ticket_search [tickets] [rounds]
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+os.environ.setdefault("SQL_RECORD", "0")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from application import create_app  # noqa: E402
+from application.extensions import db  # noqa: E402
+from application.models import ServiceTicket  # noqa: E402
+from application.util import make_token  # noqa: E402
+
+WORDS = ("oil change brake pads rotor tire rotation alignment battery coolant "
+         "flush filter belt hose spark plug wiper blade headlight bulb exhaust "
+         "muffler clutch transmission fluid inspection suspension shock strut").split()
+# (word, share of tickets that contain it)
+QUERIES = [("brake", "common"), ("muffler exhaust", "two words"), ("turbocharger", "rare")]
+
+
+def seed(n):
+    rng = random.Random(7)
+    rows = []
+    for i in range(n):
+        words = rng.sample(WORDS, 6)
+        if i % 10_000 == 0:
+            words.append("turbocharger")
+        rows.append({"description": " ".join(words), "status": "open"})
+        if len(rows) == 50_000:
+            db.session.execute(insert(ServiceTicket), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(ServiceTicket), rows)
+    db.session.commit()
+
+
+def like_page(q, limit=50):
+    stmt = select(ServiceTicket.id).order_by(ServiceTicket.id.desc()).limit(limit)
+    for word in q.split():
+        stmt = stmt.where(ServiceTicket.description.like(f"%{word}%"))
+    return db.session.scalars(stmt).all()
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(n)
+        print(f"{n} tickets seeded (FTS kept by triggers) in "
+              f"{time.perf_counter() - start:.1f} s; first page of 50")
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {make_token(1)}"}
+        print(f"  {'q':<26} {'search, ranked':>15} {'search, -id':>12} {'LIKE, ids only':>15}")
+        for q, label in QUERIES:
+            ranked, newest = (timed(lambda: client.get(
+                f"/tickets/search?q={q}&limit=50&sort={sort}", headers=headers), rounds)
+                for sort in ("rank", "-id"))
+            like_ms = timed(lambda: like_page(q), rounds)
+            print(f"  {q + ' (' + label + ')':<26} {ranked:12.1f} ms {newest:9.1f} ms "
+                  f"{like_ms:12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,15 +8,78 @@ load_dotenv()
 class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
-    # Caching & rate limit defaults (can be overridden)
-    CACHE_TYPE = "SimpleCache"
-    CACHE_DEFAULT_TIMEOUT = 60
+    # Caching & rate limit defaults (can be overridden). List caches are
+    # invalidated on commit, so the timeout only bounds memory, not staleness.
+    # SimpleCache is per process; FileSystemCache is shared by every worker
+    # on the host (point CACHE_DIR at /dev/shm to keep it in memory).
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    CACHE_DIR = os.getenv(
+        "CACHE_DIR", os.path.join(tempfile.gettempdir(), "mechanic-shop-cache"))
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
+    CACHE_THRESHOLD = int(os.getenv("CACHE_THRESHOLD", "2000"))
+    # GET /mechanics/workload: invalidated on writes like the lists, but
+    # SimpleCache is per process, so this also bounds cross-worker staleness
+    WORKLOAD_CACHE_TIMEOUT = int(os.getenv("WORKLOAD_CACHE_TIMEOUT", "30"))
     RATELIMIT_ENABLED = True
+    # memory:// is per process, so N workers each allow the full limit.
+    # sqlite:///<file> shares counters between every worker on the host
+    # (application/ratelimit_storage.py); redis:// etc. work too.
+    # sliding-window-counter keeps two counters per key and client.
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+    # Default limits by token role, keyed per user (per client IP when
+    # anonymous). List endpoints cost one unit per RATELIMIT_PAGE_COST_UNIT
+    # rows requested; a full export costs RATELIMIT_EXPORT_COST.
+    RATELIMIT_ROLE_LIMITS = {
+        "anonymous": os.getenv("RATELIMIT_ANONYMOUS", "200 per hour;50 per minute"),
+        "user": os.getenv("RATELIMIT_USER", "1000 per hour;100 per minute"),
+        "admin": os.getenv("RATELIMIT_ADMIN", "5000 per hour;500 per minute"),
+    }
+    RATELIMIT_PAGE_COST_UNIT = int(os.getenv("RATELIMIT_PAGE_COST_UNIT", "50"))
+    RATELIMIT_EXPORT_COST = int(os.getenv("RATELIMIT_EXPORT_COST", "50"))
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted
+    # for the anonymous per-IP limits. Off by default: set it to the proxy
+    # count only when clients can't reach the app directly, or they can
+    # send any X-Forwarded-For and rotate out of their limit.
+    PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+    # List endpoints: default and hard maximum page size
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+    # POST /tickets/bulk: items per request, and a budget counted in items
+    BULK_TICKET_MAX_ITEMS = int(os.getenv("BULK_TICKET_MAX_ITEMS", "500"))
+    BULK_TICKET_RATE_LIMIT = os.getenv("BULK_TICKET_RATE_LIMIT", "1000 per hour")
+    # POST /inventory/import: rows per INSERT batch, errors listed, rate limit
+    INVENTORY_IMPORT_CHUNK_SIZE = int(os.getenv("INVENTORY_IMPORT_CHUNK_SIZE", "1000"))
+    INVENTORY_IMPORT_MAX_ERRORS = int(os.getenv("INVENTORY_IMPORT_MAX_ERRORS", "100"))
+    INVENTORY_IMPORT_RATE_LIMIT = os.getenv("INVENTORY_IMPORT_RATE_LIMIT", "10 per hour")
+    # GET /tickets/export: rows fetched (and serialized) per round trip
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+    # Verified-JWT LRU cache (entries; 0 disables)
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
+    # Password hashing (werkzeug method string incl. cost). Existing hashes
+    # are upgraded on the next successful login when this changes.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    # Per-request latency, SQL and serialization histograms on GET /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    # Per-request SQL recording: logs queries slower than SQL_SLOW_QUERY_MS
+    # and statements repeated (with different parameters) more than
+    # SQL_REPEAT_THRESHOLD times in one request. On in development/testing.
+    SQL_RECORD = os.getenv("SQL_RECORD", "0") == "1"
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+    # GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>" if set;
+    # with METRICS_REQUIRE_TOKEN and no token it answers 403
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    METRICS_REQUIRE_TOKEN = os.getenv("METRICS_REQUIRE_TOKEN", "0") == "1"
 
 
 class DevelopmentConfig(Config):
     # Use env if provided, fall back to local SQLite for dev
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///dev.db")
+    SQL_RECORD = os.getenv("SQL_RECORD", "1") == "1"
 
 
 class TestingConfig(Config):
@@ -23,8 +87,30 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "SQLALCHEMY_DATABASE_URI", "sqlite:///test_ci.db")
     RATELIMIT_ENABLED = False
+    SQL_RECORD = os.getenv("SQL_RECORD", "1") == "1"
+    # Cheap hashes keep the suite fast; never use this cost in production
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
 
 
 class ProductionConfig(Config):
     # Must be set by environment in prod — but don't crash at import time
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
+    # Share cached pages (and their invalidation) across gunicorn workers
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "FileSystemCache")
+    # /metrics stays closed until METRICS_TOKEN is set
+    METRICS_REQUIRE_TOKEN = os.getenv("METRICS_REQUIRE_TOKEN", "1") == "1"
+    # Enforce limits across gunicorn workers, not per worker
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        "sqlite:///" + os.path.join(tempfile.gettempdir(), "mechanic-shop-ratelimit.db"))
+    # Connection pool, per worker process. Keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the server's
+    # connection limit. Recycle below the server's idle timeout
+    # (MySQL wait_timeout); pre-ping drops connections that died anyway.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
@@ -0,0 +1,38 @@
+"""add name indexes for list filtering
+
+Revision ID: 3c1f7a9d2e41
+Revises: 89cfee5e1f9f
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f7a9d2e41'
+down_revision = '89cfee5e1f9f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mechanic', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_mechanic_name'), ['name'], unique=False)
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inventory_name'), ['name'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_name'), ['name'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_name'))
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_name'))
+
+    with op.batch_alter_table('mechanic', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_mechanic_name'))
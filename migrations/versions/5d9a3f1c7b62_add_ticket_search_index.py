@@ -0,0 +1,59 @@
+"""add full-text search index on service_ticket.description
+
+Revision ID: 5d9a3f1c7b62
+Revises: 7e2b4c8a9f15
+Create Date: 2026-10-18 19:05:12.480113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a3f1c7b62'
+down_revision = '7e2b4c8a9f15'
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE service_ticket_fts USING fts5("
+    "description, content='service_ticket', content_rowid='id')",
+    "CREATE TRIGGER service_ticket_fts_ai AFTER INSERT ON service_ticket BEGIN "
+    "INSERT INTO service_ticket_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER service_ticket_fts_ad AFTER DELETE ON service_ticket BEGIN "
+    "INSERT INTO service_ticket_fts(service_ticket_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER service_ticket_fts_au AFTER UPDATE OF description ON service_ticket BEGIN "
+    "INSERT INTO service_ticket_fts(service_ticket_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO service_ticket_fts(rowid, description) VALUES (new.id, new.description); END",
+    # index the rows that already exist
+    "INSERT INTO service_ticket_fts(service_ticket_fts) VALUES ('rebuild')",
+)
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER service_ticket_fts_au",
+    "DROP TRIGGER service_ticket_fts_ad",
+    "DROP TRIGGER service_ticket_fts_ai",
+    "DROP TABLE service_ticket_fts",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("CREATE INDEX ix_service_ticket_description_fts ON service_ticket "
+                   "USING gin (to_tsvector('english', description))")
+    elif dialect == 'mysql':
+        op.execute("CREATE FULLTEXT INDEX ix_service_ticket_description_fts "
+                   "ON service_ticket (description)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect in ('postgresql', 'mysql'):
+        op.drop_index('ix_service_ticket_description_fts', table_name='service_ticket')
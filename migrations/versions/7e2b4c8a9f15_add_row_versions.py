@@ -0,0 +1,31 @@
+"""add row version columns for etags
+
+Revision ID: 7e2b4c8a9f15
+Revises: 3c1f7a9d2e41
+Create Date: 2026-10-18 11:40:05.221734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2b4c8a9f15'
+down_revision = '3c1f7a9d2e41'
+branch_labels = None
+depends_on = None
+
+TABLES = ('user', 'mechanic', 'inventory', 'service_ticket')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(
+                'version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
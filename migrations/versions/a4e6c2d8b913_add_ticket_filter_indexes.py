@@ -0,0 +1,42 @@
+"""add composite indexes for ticket list filters
+
+Revision ID: a4e6c2d8b913
+Revises: 5d9a3f1c7b62
+Create Date: 2026-10-18 20:41:07.215390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e6c2d8b913'
+down_revision = '5d9a3f1c7b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_ticket', schema=None) as batch_op:
+        batch_op.create_index('ix_service_ticket_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_service_ticket_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_service_ticket_primary_mechanic_id_id', ['primary_mechanic_id', 'id'], unique=False)
+
+    with op.batch_alter_table('ticket_mechanics', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_mechanics_mechanic_id_ticket_id', ['mechanic_id', 'ticket_id'], unique=False)
+
+    with op.batch_alter_table('ticket_parts', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_parts_inventory_id_ticket_id', ['inventory_id', 'ticket_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ticket_parts', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_parts_inventory_id_ticket_id')
+
+    with op.batch_alter_table('ticket_mechanics', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_mechanics_mechanic_id_ticket_id')
+
+    with op.batch_alter_table('service_ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_ticket_primary_mechanic_id_id')
+        batch_op.drop_index('ix_service_ticket_user_id_id')
+        batch_op.drop_index('ix_service_ticket_status_id')
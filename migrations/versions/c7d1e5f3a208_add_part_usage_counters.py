@@ -0,0 +1,50 @@
+"""add ticket_parts.attached_at and part_usage counters
+
+Revision ID: c7d1e5f3a208
+Revises: a4e6c2d8b913
+Create Date: 2026-10-18 21:32:54.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e5f3a208'
+down_revision = 'a4e6c2d8b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite can't ADD COLUMN with a non-constant default; copy the table.
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table('ticket_parts', schema=None, recreate=recreate) as batch_op:
+        batch_op.add_column(sa.Column('attached_at', sa.DateTime(), nullable=False,
+                                      server_default=sa.func.current_timestamp()))
+
+    op.create_table('part_usage',
+    sa.Column('inventory_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('uses', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['inventory_id'], ['inventory.id'], ),
+    sa.PrimaryKeyConstraint('inventory_id', 'day')
+    )
+    with op.batch_alter_table('part_usage', schema=None) as batch_op:
+        batch_op.create_index('ix_part_usage_day_inventory_id', ['day', 'inventory_id', 'uses'], unique=False)
+
+    # Existing links all count as attached today; `flask inventory
+    # rebuild-usage` recomputes the same thing in chunks.
+    op.execute(
+        "INSERT INTO part_usage (inventory_id, day, uses) "
+        "SELECT inventory_id, date(attached_at), count(*) FROM ticket_parts "
+        "GROUP BY inventory_id, date(attached_at)")
+
+
+def downgrade():
+    with op.batch_alter_table('part_usage', schema=None) as batch_op:
+        batch_op.drop_index('ix_part_usage_day_inventory_id')
+
+    op.drop_table('part_usage')
+    with op.batch_alter_table('ticket_parts', schema=None) as batch_op:
+        batch_op.drop_column('attached_at')
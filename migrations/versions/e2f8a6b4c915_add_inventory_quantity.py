@@ -0,0 +1,28 @@
+"""add inventory.quantity (stock, NULL = untracked)
+
+Revision ID: e2f8a6b4c915
+Revises: c7d1e5f3a208
+Create Date: 2026-10-18 22:47:19.603551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f8a6b4c915'
+down_revision = 'c7d1e5f3a208'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quantity', sa.Integer(), nullable=True))
+        batch_op.create_check_constraint('ck_inventory_quantity_nonnegative', 'quantity >= 0')
+
+
+def downgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_inventory_quantity_nonnegative', type_='check')
+        batch_op.drop_column('quantity')
@@ -1,8 +1,11 @@
 # tests/test_base.py
 from application import create_app
+from contextlib import contextmanager
 import os
 import unittest
 
+from sqlalchemy import event
+
 # Make sure env is set BEFORE creating the app
 os.environ.setdefault("FLASK_ENV", "testing")
 os.environ.setdefault("TESTING", "1")
@@ -15,6 +18,8 @@ try:
 except Exception:
     # Fallback if db is re-exported elsewhere
     from application import db
+from application.extensions import cache
+from application.query_log import request_queries
 
 
 class DBTestCase(unittest.TestCase):
@@ -34,6 +39,7 @@ class DBTestCase(unittest.TestCase):
         self.ctx.push()
         db.drop_all()
         db.create_all()
+        cache.clear()
         self.client = self.app.test_client()
 
     def tearDown(self):
@@ -42,6 +48,38 @@ class DBTestCase(unittest.TestCase):
         db.drop_all()
         self.ctx.pop()
 
+    @contextmanager
+    def count_queries(self):
+        """Collect every SQL statement the engine runs inside the block."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    @contextmanager
+    def query_budget(self, max_queries):
+        """Fail if any request made inside the block runs more than max_queries statements."""
+        over = []
+
+        def check(app, route, queries):
+            if len(queries) > max_queries:
+                over.append((route, queries))
+
+        request_queries.connect(check)
+        try:
+            yield
+        finally:
+            request_queries.disconnect(check)
+        for route, queries in over:
+            self.fail(f"{route} ran {len(queries)} statements, budget {max_queries}:\n"
+                      + "\n".join(q.statement for q in queries))
+
     # Helper to create a token for protected routes
     def auth_headers(self, email="tester@example.com", password="pw"):
         # ✅ Your signup route is POST /users/
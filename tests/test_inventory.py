@@ -1,4 +1,21 @@
 # tests/test_inventory.py
+import io
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+from sqlalchemy import func, insert, update
+
+from config import TestingConfig
+from application import create_app
+from application.extensions import db
+from application.bulk import read_records
+from application.models import Inventory, ServiceTicket, part_usage, ticket_parts
+from application.util import make_token
 from .test_base import DBTestCase
 
 
@@ -47,3 +64,349 @@ class InventoryRouteTests(DBTestCase):
     def test_inventory_get_404(self):
         res = self.client.get("/inventory/999999")
         self.assertEqual(res.status_code, 404)
+
+    def test_inventory_list_paginated(self):
+        headers = self.auth_headers()
+        for name in ["Belt A", "Belt B", "Filter"]:
+            self.client.post("/inventory/", json={"name": name}, headers=headers)
+        res = self.client.get("/inventory/?name=Belt&limit=1")
+        body = res.get_json()
+        self.assertEqual([p["name"] for p in body["items"]], ["Belt B"])
+        res = self.client.get(
+            f"/inventory/?name=Belt&limit=1&after={body['next_cursor']}")
+        self.assertEqual([p["name"] for p in res.get_json()["items"]], ["Belt A"])
+
+    def test_inventory_list_cached_until_write(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/inventory/", json={"name": "Belt"}, headers=headers).get_json()["id"]
+        self.client.get("/inventory/")
+        with self.count_queries() as statements:
+            res = self.client.get("/inventory/")
+        self.assertEqual(len(statements), 0)
+        self.client.put(f"/inventory/{pid}", json={"name": "Belt XL"}, headers=headers)
+        res = self.client.get("/inventory/")
+        self.assertEqual(res.get_json()["items"][0]["name"], "Belt XL")
+
+    def test_inventory_update_if_match_412_on_stale_etag(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/inventory/", json={"name": "Rotor"}, headers=headers).get_json()["id"]
+        etag = self.client.get(f"/inventory/{pid}").headers["ETag"]
+        res = self.client.put(f"/inventory/{pid}", json={"name": "Rotor A"},
+                              headers={**headers, "If-Match": etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers["ETag"], etag)
+        # a second terminal still holding the old ETag loses
+        res = self.client.put(f"/inventory/{pid}", json={"name": "Rotor B"},
+                              headers={**headers, "If-Match": etag})
+        self.assertEqual(res.status_code, 412)
+        self.assertEqual(self.client.get(f"/inventory/{pid}").get_json()["name"], "Rotor A")
+
+    def test_inventory_import_csv_dedupes_and_reports_errors(self):
+        headers = self.auth_headers()
+        self.client.post("/inventory/", json={"name": "Belt"}, headers=headers)
+        self.client.get("/inventory/")  # warm the list cache
+        body = "name,sku\nBelt,1\nFilter,2\n,3\nRotor,4\nFilter,5\n"
+        self.app.config["INVENTORY_IMPORT_CHUNK_SIZE"] = 1
+        try:
+            res = self.client.post("/inventory/import", data=body,
+                                   content_type="text/csv", headers=headers)
+        finally:
+            self.app.config["INVENTORY_IMPORT_CHUNK_SIZE"] = 1000
+        self.assertEqual(res.status_code, 207)
+        report = res.get_json()
+        self.assertEqual(
+            {k: report[k] for k in ("received", "inserted", "duplicates", "failed")},
+            {"received": 5, "inserted": 2, "duplicates": 2, "failed": 1})
+        self.assertEqual(report["errors"], [{"line": 4, "error": "name required"}])
+        names = [p["name"] for p in self.client.get("/inventory/?sort=name").get_json()["items"]]
+        self.assertEqual(names, ["Belt", "Filter", "Rotor"])
+
+    def test_inventory_import_ndjson(self):
+        headers = self.auth_headers()
+        body = '{"name": "Pad"}\n\nnot json\n[1]\n{"name": "Shoe"}\n'
+        res = self.client.post("/inventory/import", data=body,
+                               content_type="application/x-ndjson", headers=headers)
+        report = res.get_json()
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual([e["line"] for e in report["errors"]], [3, 4])
+        res = self.client.post("/inventory/import", data=body,
+                               content_type="application/json", headers=headers)
+        self.assertEqual(res.status_code, 415)
+
+    def test_inventory_import_quantity(self):
+        headers = self.auth_headers()
+        body = "name,quantity\nBelt,3\nPad,\nRotor,-1\nShoe,2.5\n"
+        res = self.client.post("/inventory/import", data=body,
+                               content_type="text/csv", headers=headers)
+        self.assertEqual(res.status_code, 207)
+        self.assertEqual([e["line"] for e in res.get_json()["errors"]], [4, 5])
+        body = '{"name": "Clip", "quantity": 0}\n{"name": "Hose", "quantity": true}\n'
+        res = self.client.post("/inventory/import", data=body,
+                               content_type="application/x-ndjson", headers=headers)
+        self.assertEqual(res.get_json()["errors"],
+                         [{"line": 2, "error": "quantity must be a non-negative integer or null"}])
+        stock = {p["name"]: p["quantity"]
+                 for p in self.client.get("/inventory/").get_json()["items"]}
+        self.assertEqual(stock, {"Belt": 3, "Pad": None, "Clip": 0})
+
+
+class BareStream:
+    """Like gunicorn's Body: read/readline only, no io.RawIOBase methods."""
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._buf.read(size)
+
+    def readline(self, size=-1):
+        return self._buf.readline(size)
+
+
+class ReadRecordsTests(unittest.TestCase):
+    def test_reads_csv_from_bare_stream(self):
+        body = '\ufeffname\r\n"Oil\nFilter"\r\nPad\r\n'.encode()
+        rows = list(read_records(BareStream(body), "csv"))
+        self.assertEqual([(line, rec["name"]) for line, rec, _ in rows],
+                         [(3, "Oil\nFilter"), (4, "Pad")])
+
+    def test_reads_ndjson_from_bare_stream(self):
+        rows = list(read_records(BareStream(b'{"name": "Pad"}\n[1]\n'), "ndjson"))
+        self.assertEqual(rows, [(1, {"name": "Pad"}, None),
+                                (2, None, "line must be a JSON object")])
+
+    def test_bad_encoding_is_value_error(self):
+        with self.assertRaises(ValueError):
+            list(read_records(BareStream(b"name\n\xff\n"), "csv"))
+
+
+class PartUsageTests(DBTestCase):
+    def _seed(self, headers):
+        pids = [self.client.post("/inventory/", json={"name": n}, headers=headers)
+                .get_json()["id"] for n in ("Filter", "Pad", "Bulb")]
+        tids = [self.client.post("/tickets/", json={"description": f"Job {i}"},
+                                 headers=headers).get_json()["id"] for i in range(3)]
+        return pids, tids
+
+    def _usage(self, headers, qs=""):
+        res = self.client.get(f"/inventory/usage{qs}", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        return res.get_json()["items"]
+
+    def _counters(self):
+        return sorted(db.session.execute(
+            db.select(part_usage).where(part_usage.c.uses != 0)).all())
+
+    def test_counters_follow_every_link_path(self):
+        headers = self.auth_headers()
+        (filt, pad, bulb), (t1, t2, t3) = self._seed(headers)
+        self.client.post(f"/tickets/{t1}/add-part/{filt}", headers=headers)
+        self.client.post(f"/tickets/{t1}/add-part/{filt}", headers=headers)  # no-op
+        self.client.put(f"/tickets/{t2}/parts", json={"add_ids": [filt, pad]}, headers=headers)
+        self.client.put(f"/tickets/{t3}/parts", json={"add_ids": [filt, pad, bulb, 999]},
+                        headers=headers)
+        items = self._usage(headers)
+        self.assertEqual([(i["inventory_id"], i["uses"]) for i in items],
+                         [(filt, 3), (pad, 2), (bulb, 1)])
+        self.assertEqual(len(self._usage(headers, "?top=1")), 1)
+
+        # re-adding an attached part and removing one count once each
+        self.client.put(f"/tickets/{t3}/parts", json={"add_ids": [pad], "remove_ids": [filt]},
+                        headers=headers)
+        self.client.delete(f"/tickets/{t2}", headers=headers)
+        self.client.delete(f"/inventory/{bulb}", headers=headers)
+        items = self._usage(headers)
+        self.assertEqual([(i["inventory_id"], i["uses"]) for i in items],
+                         [(filt, 1), (pad, 1)])
+
+    def test_time_buckets_and_rebuild(self):
+        headers = self.auth_headers()
+        (filt, pad, _), (t1, t2, t3) = self._seed(headers)
+        for tid in (t1, t2, t3):
+            self.client.put(f"/tickets/{tid}/parts", json={"add_ids": [filt]}, headers=headers)
+        self.client.post(f"/tickets/{t1}/add-part/{pad}", headers=headers)
+        live = self._counters()
+        # move one link into an earlier month behind the counters' back
+        today = datetime.now(timezone.utc).date()
+        old = today.replace(day=1) - timedelta(days=40)
+        db.session.execute(ticket_parts.update().where(ticket_parts.c.ticket_id == t1,
+                                                       ticket_parts.c.inventory_id == filt)
+                           .values(attached_at=datetime.combine(old, datetime.min.time())))
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["inventory", "rebuild-usage",
+                                                         "--chunk-size", "1"])
+        self.assertIn("for 3 parts", result.output)
+        self.assertEqual(sum(r.uses for r in self._counters()), sum(r.uses for r in live))
+
+        items = self._usage(headers, f"?since={old.isoformat()}&bucket=month")
+        self.assertEqual(items[0]["inventory_id"], filt)
+        self.assertEqual(items[0]["buckets"], [
+            {"start": old.replace(day=1).isoformat(), "uses": 1},
+            {"start": today.replace(day=1).isoformat(), "uses": 2}])
+        # default window is the last 30 days
+        self.assertEqual([(i["inventory_id"], i["uses"]) for i in self._usage(headers)],
+                         [(filt, 2), (pad, 1)])
+        items = self._usage(headers, f"?since={old}&until={old}&bucket=week")
+        self.assertEqual(items[0]["buckets"], [
+            {"start": (old - timedelta(days=old.weekday())).isoformat(), "uses": 1}])
+
+    def test_usage_400_bad_params(self):
+        headers = self.auth_headers()
+        for qs in ("?since=yesterday", "?top=0", "?bucket=year",
+                   f"?since={date(2026, 2, 1)}&until={date(2026, 1, 1)}"):
+            res = self.client.get(f"/inventory/usage{qs}", headers=headers)
+            self.assertEqual(res.status_code, 400, qs)
+
+
+class StockTests(DBTestCase):
+    def _part(self, headers, quantity):
+        return self.client.post("/inventory/", json={"name": f"Part {quantity}",
+                                                     "quantity": quantity},
+                                headers=headers).get_json()
+
+    def _ticket(self, headers):
+        return self.client.post("/tickets/", json={"description": "Job"},
+                                headers=headers).get_json()["id"]
+
+    def test_quantity_create_update_and_validation(self):
+        headers = self.auth_headers()
+        part = self._part(headers, 3)
+        self.assertEqual(part["quantity"], 3)
+        self.assertIsNone(self._part(headers, None)["quantity"])
+        for bad in (-1, "3", 1.5, True):
+            res = self.client.post("/inventory/", json={"name": "X", "quantity": bad},
+                                   headers=headers)
+            self.assertEqual(res.status_code, 400, bad)
+        res = self.client.put(f"/inventory/{part['id']}", json={"quantity": 10},
+                              headers=headers)
+        self.assertEqual(res.get_json()["quantity"], 10)
+        res = self.client.put(f"/inventory/{part['id']}", json={"quantity": -2},
+                              headers=headers)
+        self.assertEqual(res.status_code, 400)
+
+    def test_add_part_takes_stock_until_409(self):
+        headers = self.auth_headers()
+        pid = self._part(headers, 1)["id"]
+        untracked = self._part(headers, None)["id"]
+        t1, t2 = self._ticket(headers), self._ticket(headers)
+        etag = self.client.get(f"/inventory/{pid}").headers["ETag"]
+        res = self.client.post(f"/tickets/{t1}/add-part/{pid}", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        # the returned ETag is the ticket's current one, usable as If-Match
+        self.assertEqual(res.headers["ETag"], self.client.get(
+            f"/tickets/{t1}", headers=headers).headers["ETag"])
+        # already attached: no second unit taken
+        self.assertEqual(self.client.post(f"/tickets/{t1}/add-part/{pid}",
+                                          headers=headers).status_code, 200)
+        res = self.client.get(f"/inventory/{pid}")
+        self.assertEqual(res.get_json()["quantity"], 0)
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+        res = self.client.post(f"/tickets/{t2}/add-part/{pid}", headers=headers)
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.get_json()["inventory_ids"], [pid])
+        self.assertEqual(self.client.get(f"/tickets/{t2}", headers=headers)
+                         .get_json()["parts"], [])
+        self.assertEqual(self.client.post(f"/tickets/{t2}/add-part/{untracked}",
+                                          headers=headers).status_code, 200)
+
+    def test_edit_parts_takes_stock_all_or_nothing(self):
+        headers = self.auth_headers()
+        plenty, last, untracked = (self._part(headers, q)["id"] for q in (5, 1, None))
+        t1, t2 = self._ticket(headers), self._ticket(headers)
+        res = self.client.put(f"/tickets/{t1}/parts",
+                              json={"add_ids": [plenty, last, untracked]}, headers=headers)
+        self.assertEqual(res.status_code, 200)
+        res = self.client.put(f"/tickets/{t2}/parts",
+                              json={"add_ids": [plenty, last]}, headers=headers)
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.get_json()["inventory_ids"], [last])
+        quantities = {p: self.client.get(f"/inventory/{p}").get_json()["quantity"]
+                      for p in (plenty, last, untracked)}
+        self.assertEqual(quantities, {plenty: 4, last: 0, untracked: None})
+        self.assertEqual(self.client.get(f"/tickets/{t2}", headers=headers)
+                         .get_json()["parts"], [])
+
+
+class StockConcurrencyTests(unittest.TestCase):
+    """Many writers on one hot part against a file database."""
+    STOCK = 40
+    TICKETS = 100
+    WRITERS = 8
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        uri = "sqlite:///" + os.path.join(self.tmp.name, "stock.db")
+        with mock.patch.object(TestingConfig, "SQLALCHEMY_DATABASE_URI", uri):
+            self.app = create_app("testing")
+        self.app.config["SQL_RECORD"] = False
+        with self.app.app_context():
+            db.create_all()
+            db.session.execute(insert(Inventory).values(id=1, name="Hot", quantity=self.STOCK))
+            db.session.execute(insert(ServiceTicket), [
+                {"description": f"Job {i}", "status": "open"} for i in range(self.TICKETS)])
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {make_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engines[None].dispose()
+        self.tmp.cleanup()
+
+    def _add_part(self, client, tid):
+        return client.post(f"/tickets/{tid}/add-part/1", headers=self.headers)
+
+    def _edit_parts(self, client, tid):
+        return client.put(f"/tickets/{tid}/parts", json={"add_ids": [1]},
+                          headers=self.headers)
+
+    def _run_writers(self, tids_per_writer, send=None):
+        send = send or self._add_part
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def writer(tids):
+            client = self.app.test_client()
+            for tid in tids:
+                status = send(client, tid).status_code
+                with lock:
+                    statuses[status] += 1
+
+        threads = [threading.Thread(target=writer, args=(tids,)) for tids in tids_per_writer]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_no_overselling_under_concurrent_add_part(self):
+        tids = list(range(1, self.TICKETS + 1))
+        statuses = self._run_writers([tids[i::self.WRITERS] for i in range(self.WRITERS)])
+
+        self.assertEqual(statuses, {200: self.STOCK, 409: self.TICKETS - self.STOCK})
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Inventory, 1).quantity, 0)
+            self.assertEqual(db.session.scalar(
+                db.select(func.count()).select_from(ticket_parts)), self.STOCK)
+            self.assertEqual(db.session.scalar(
+                db.select(func.sum(part_usage.c.uses))), self.STOCK)
+
+    def test_identical_concurrent_add_part_takes_one_unit(self):
+        for send in (self._add_part, self._edit_parts):
+            with self.subTest(send.__name__):
+                with self.app.app_context():
+                    db.session.execute(ticket_parts.delete())
+                    db.session.execute(part_usage.delete())
+                    db.session.execute(
+                        update(Inventory).values(quantity=self.STOCK))
+                    db.session.commit()
+                statuses = self._run_writers(
+                    [[1] * 5 for _ in range(self.WRITERS)], send)
+                self.assertEqual(statuses, {200: 5 * self.WRITERS})
+                with self.app.app_context():
+                    self.assertEqual(
+                        db.session.get(Inventory, 1).quantity, self.STOCK - 1)
+                    self.assertEqual(db.session.scalar(
+                        db.select(func.sum(part_usage.c.uses))), 1)
@@ -1,4 +1,10 @@
 # tests/test_mechanics.py
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from application.etag import stale_delete
+from application.models import Mechanic
+from application.pagination import encode_cursor
 from .test_base import DBTestCase
 
 
@@ -46,3 +52,130 @@ class MechanicsRouteTests(DBTestCase):
     def test_mechanic_get_404(self):
         res = self.client.get("/mechanics/999999")
         self.assertEqual(res.status_code, 404)
+
+    def test_mechanics_list_name_prefix_and_sort(self):
+        headers = self.auth_headers()
+        for name in ["Sam", "Sally", "Bob", "Sage"]:
+            self.client.post("/mechanics/", json={"name": name}, headers=headers)
+        res = self.client.get("/mechanics/?name=Sa&sort=name&limit=2")
+        self.assertEqual(res.status_code, 200)
+        body = res.get_json()
+        self.assertEqual([m["name"] for m in body["items"]], ["Sage", "Sally"])
+        res = self.client.get(
+            f"/mechanics/?name=Sa&sort=name&limit=2&after={body['next_cursor']}")
+        body = res.get_json()
+        self.assertEqual([m["name"] for m in body["items"]], ["Sam"])
+        self.assertIsNone(body["next_cursor"])
+
+    def test_mechanics_list_400_bad_sort(self):
+        res = self.client.get("/mechanics/?sort=salary")
+        self.assertEqual(res.status_code, 400)
+
+    def test_mechanics_list_400_tampered_cursor(self):
+        tampered = {
+            "object value": {"s": "name", "id": 1, "v": {"a": 1}},
+            "list value": {"s": "name", "id": 1, "v": [1, 2]},
+            "int value for a text column": {"s": "name", "id": 1, "v": 7},
+            "bool id": {"s": "name", "id": True, "v": "Sam"},
+            "id beyond 64 bits": {"s": "name", "id": 10 ** 30, "v": "Sam"},
+            "id beyond 64 bits, id sort": {"s": "-id", "id": 2 ** 63},
+        }
+        for case, payload in tampered.items():
+            with self.subTest(case):
+                res = self.client.get(
+                    f"/mechanics/?sort={payload['s']}&after={encode_cursor(payload)}")
+                self.assertEqual(res.status_code, 400)
+                self.assertEqual(res.get_json(), {"error": "invalid cursor"})
+
+    def test_mechanics_list_cache_invalidated_on_write(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Casey"}, headers=headers).get_json()["id"]
+        self.assertEqual(len(self.client.get("/mechanics/").get_json()["items"]), 1)
+        self.client.post("/mechanics/", json={"name": "Riley"}, headers=headers)
+        self.assertEqual(len(self.client.get("/mechanics/").get_json()["items"]), 2)
+        self.client.put(f"/mechanics/{mid}", json={"name": "Casey T"}, headers=headers)
+        names = {m["name"] for m in self.client.get("/mechanics/").get_json()["items"]}
+        self.assertIn("Casey T", names)
+        self.client.delete(f"/mechanics/{mid}", headers=headers)
+        self.assertEqual(len(self.client.get("/mechanics/").get_json()["items"]), 1)
+
+    def test_mechanic_get_etag_304(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Riley"}, headers=headers).get_json()["id"]
+        etag = self.client.get(f"/mechanics/{mid}").headers["ETag"]
+        res = self.client.get(f"/mechanics/{mid}", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.get_data(), b"")
+        self.client.put(f"/mechanics/{mid}", json={"name": "Riley T"}, headers=headers)
+        res = self.client.get(f"/mechanics/{mid}", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_mechanics_list_etag_304_from_cache(self):
+        headers = self.auth_headers()
+        self.client.post("/mechanics/", json={"name": "Casey"}, headers=headers)
+        etag = self.client.get("/mechanics/").headers["ETag"]
+        # second request is served from the list cache
+        res = self.client.get("/mechanics/", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+
+    def test_workload_counts_and_invalidation(self):
+        headers = self.auth_headers()
+        m1, m2, idle = [self.client.post("/mechanics/", json={"name": n},
+                                         headers=headers).get_json()["id"]
+                        for n in ("Casey", "Riley", "Sam")]
+        t1 = self.client.post("/tickets/", json={"description": "Brakes",
+                                                "primary_mechanic_id": m1},
+                              headers=headers).get_json()["id"]
+        t2 = self.client.post("/tickets/", json={"description": "Oil"},
+                              headers=headers).get_json()["id"]
+        self.client.put(f"/tickets/{t1}/edit", json={"add_ids": [m1, m2]}, headers=headers)
+
+        def workload(qs=""):
+            res = self.client.get(f"/mechanics/workload{qs}", headers=headers)
+            self.assertEqual(res.status_code, 200)
+            return {w["mechanic_id"]: (w["assigned"], w["primary"])
+                    for w in res.get_json()["items"]}
+        self.assertEqual(workload(), {m1: (1, 1), m2: (1, 0), idle: (0, 0)})
+        # served from cache: no SQL at all
+        with self.count_queries() as statements:
+            workload()
+        self.assertEqual(statements, [])
+        self.client.put(f"/tickets/{t2}/edit", json={"add_ids": [m2]}, headers=headers)
+        self.assertEqual(workload()[m2], (2, 0))
+        self.client.post("/tickets/", json={"description": "Tires",
+                                            "primary_mechanic_id": m2}, headers=headers)
+        self.assertEqual(workload()[m2], (2, 1))
+        self.client.delete(f"/tickets/{t1}", headers=headers)
+        self.assertEqual(workload(), {m1: (0, 0), m2: (1, 1), idle: (0, 0)})
+        self.assertEqual(workload("?status=closed"), {m1: (0, 0), m2: (0, 0), idle: (0, 0)})
+
+    def test_workload_requires_auth(self):
+        self.assertEqual(self.client.get("/mechanics/workload").status_code, 401)
+
+    def _race_delete(self, mid, concurrent):
+        """DELETE /mechanics/<mid>, running `concurrent` just before its flush."""
+        headers = self.auth_headers()
+
+        def before_flush(session, context, instances):
+            if any(isinstance(obj, Mechanic) for obj in session.deleted):
+                session.connection().execute(concurrent)
+        event.listen(Session, "before_flush", before_flush)
+        try:
+            return self.client.delete(f"/mechanics/{mid}", headers=headers)
+        finally:
+            event.remove(Session, "before_flush", before_flush)
+
+    def test_delete_mechanic_raced_by_update_412(self):
+        mid = self.client.post("/mechanics/", json={"name": "Casey"},
+                               headers=self.auth_headers()).get_json()["id"]
+        res = self._race_delete(mid, update(Mechanic).where(Mechanic.id == mid)
+                                .values(version=Mechanic.version + 1))
+        self.assertEqual(res.status_code, 412)
+        self.assertEqual(self.client.get(f"/mechanics/{mid}").status_code, 200)
+
+    def test_stale_delete_404_when_row_is_gone(self):
+        with self.app.test_request_context():
+            res, status = stale_delete(Mechanic, 424242)
+        self.assertEqual(status, 404)
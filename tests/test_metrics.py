@@ -0,0 +1,124 @@
+# tests/test_metrics.py
+import unittest
+from types import SimpleNamespace
+
+from flask import g
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from application.metrics import (
+    POOL_TIMEOUTS, POOL_WAIT, REQUEST_SERIALIZE_SECONDS, REQUEST_STATEMENTS,
+    REQUESTS, Histogram, RequestStats, TimedQueuePool, pool_stats,
+    _after_cursor_execute, _before_cursor_execute)
+from .test_base import DBTestCase
+
+
+class HistogramTests(unittest.TestCase):
+    def test_render_is_cumulative(self):
+        h = Histogram("req_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            h.observe(value, route="/x")
+        text = "\n".join(h.render())
+        self.assertIn('req_seconds_bucket{route="/x",le="0.1"} 1', text)
+        self.assertIn('req_seconds_bucket{route="/x",le="1.0"} 3', text)
+        self.assertIn('req_seconds_bucket{route="/x",le="+Inf"} 4', text)
+        self.assertIn('req_seconds_count{route="/x"} 4', text)
+        self.assertIn('req_seconds_sum{route="/x"} 4.05', text)
+
+
+class PoolMetricsTests(unittest.TestCase):
+    def test_checkout_wait_timeouts_and_saturation(self):
+        engine = create_engine("sqlite://", poolclass=TimedQueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=0.05)
+        waits, timeouts = POOL_WAIT.snapshot()[2], POOL_TIMEOUTS.value()
+        held = engine.connect()
+        self.assertEqual(pool_stats(engine.pool)["saturation"], 1.0)
+        with self.assertRaises(PoolTimeout):
+            engine.connect()
+        held.close()
+        self.assertEqual(pool_stats(engine.pool)["checked_out"], 0)
+        self.assertEqual(POOL_WAIT.snapshot()[2], waits + 2)
+        self.assertEqual(POOL_TIMEOUTS.value(), timeouts + 1)
+        engine.dispose()
+
+
+class MetricsEndpointTests(DBTestCase):
+    def test_metrics_prometheus_text(self):
+        res = self.client.get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE db_pool_checkout_wait_seconds histogram", res.get_data(as_text=True))
+
+    def test_token_cache_counts_are_exported(self):
+        headers = self.auth_headers()
+        self.client.get("/inventory/usage", headers=headers)
+        self.client.get("/inventory/usage", headers=headers)
+        stats = self.app.extensions["token_cache"].stats()
+        self.assertGreater(stats["hits"], 0)
+        body = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn("# TYPE token_cache_lookups_total counter", body)
+        self.assertIn(f'token_cache_lookups_total{{result="hit"}} {stats["hits"]}', body)
+        self.assertIn(f'token_cache_lookups_total{{result="miss"}} {stats["misses"]}', body)
+        self.assertIn(f"token_cache_capacity {stats['maxsize']}", body)
+
+    def test_metrics_token(self):
+        self.app.config["METRICS_TOKEN"] = "s3cret"
+        try:
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            res = self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+            self.assertEqual(res.status_code, 200)
+        finally:
+            self.app.config["METRICS_TOKEN"] = None
+
+    def test_metrics_closed_without_token_when_required(self):
+        self.app.config["METRICS_REQUIRE_TOKEN"] = True
+        try:
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+        finally:
+            self.app.config["METRICS_REQUIRE_TOKEN"] = False
+
+    def test_unknown_methods_share_one_label(self):
+        labels = {"blueprint": "app", "route": "unmatched", "status": "405"}
+        before = REQUESTS.value(method="other", **labels)
+        for verb in ("BREW", "WHEN"):
+            self.client.open("/inventory/", method=verb)
+        self.assertEqual(REQUESTS.value(method="other", **labels), before + 2)
+        self.assertEqual(REQUESTS.value(method="BREW", **labels), 0)
+
+    def test_request_latency_sql_and_serialization_by_blueprint(self):
+        # The registry is process-wide, so compare before/after snapshots.
+        labels = {"blueprint": "inventory", "route": "/inventory/<int:pid>",
+                  "method": "GET"}
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/inventory/", json={"name": "Belt"}, headers=headers).get_json()["id"]
+        ok, missing = (REQUESTS.value(status=s, **labels) for s in (200, 404))
+        counts, _, n = REQUEST_STATEMENTS.snapshot(**labels)
+        serialized = REQUEST_SERIALIZE_SECONDS.snapshot(**labels)[2]
+        self.client.get(f"/inventory/{pid}")
+        self.client.get("/inventory/999999")
+        self.assertEqual(REQUESTS.value(status=200, **labels), ok + 1)
+        self.assertEqual(REQUESTS.value(status=404, **labels), missing + 1)
+        after, _, n_after = REQUEST_STATEMENTS.snapshot(**labels)
+        self.assertEqual(n_after, n + 2)
+        # both lookups ran exactly one SELECT (bucket le=1)
+        self.assertEqual(after[1] - counts[1], 2)
+        self.assertEqual(REQUEST_SERIALIZE_SECONDS.snapshot(**labels)[2], serialized + 2)
+        text = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count{blueprint="inventory",'
+                      'route="/inventory/<int:pid>",method="GET"}', text)
+        self.assertIn('blueprint="user",route="/users/login",method="POST"', text)
+
+    def test_interleaved_statements_on_one_connection(self):
+        conn = SimpleNamespace(info={})
+        first, second = SimpleNamespace(), SimpleNamespace()
+        with self.app.test_request_context():
+            g._request_stats = stats = RequestStats()
+            # a shared StaticPool connection: B starts before A finishes
+            _before_cursor_execute(conn, None, "A", None, first, False)
+            _before_cursor_execute(conn, None, "B", None, second, False)
+            _after_cursor_execute(conn, None, "A", None, first, False)
+            _after_cursor_execute(conn, None, "B", None, second, False)
+            # an after without a matching before is skipped, not an error
+            _after_cursor_execute(conn, None, "C", None, SimpleNamespace(), False)
+        self.assertEqual(stats.statements, 2)
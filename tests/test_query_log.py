@@ -0,0 +1,68 @@
+# tests/test_query_log.py
+from types import SimpleNamespace
+
+from flask import g
+
+from application.extensions import db
+from application.models import Mechanic
+from application.query_log import (
+    _after_cursor_execute, _before_cursor_execute, _finish_request, _start_request,
+    repeated_statements, RecordedQuery)
+from .test_base import DBTestCase
+
+
+class QueryLogTests(DBTestCase):
+    def test_repeated_statements_needs_differing_parameters(self):
+        same = [RecordedQuery("SELECT 1", (1,), 0.0)] * 6
+        varied = [RecordedQuery("SELECT ?", (i,), 0.0) for i in range(6)]
+        self.assertEqual(repeated_statements(same + varied, 5), {"SELECT ?": 6})
+        self.assertEqual(repeated_statements(varied, 6), {})
+
+    def test_n_plus_one_is_logged_with_route(self):
+        db.session.add_all([Mechanic(name=f"M{i}") for i in range(8)])
+        db.session.commit()
+        db.session.expunge_all()
+        with self.app.test_request_context("/mechanics/"):
+            _start_request()
+            for mid in range(1, 9):
+                db.session.get(Mechanic, mid)
+            with self.assertLogs("application", "WARNING") as logs:
+                _finish_request(None)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("possible N+1 in GET /mechanics/: 8 runs of SELECT", logs.output[0])
+
+    def test_slow_queries_are_logged(self):
+        self.app.config["SQL_SLOW_QUERY_MS"] = 0
+        try:
+            with self.assertLogs("application", "WARNING") as logs:
+                self.client.get("/inventory/1")
+        finally:
+            self.app.config["SQL_SLOW_QUERY_MS"] = 100
+        self.assertIn("slow query", logs.output[0])
+        self.assertIn("GET /inventory/<int:pid>", logs.output[0])
+
+    def test_query_budget(self):
+        headers = self.auth_headers()
+        tid = self.client.post("/tickets/", json={"description": "Brakes"},
+                               headers=headers).get_json()["id"]
+        with self.query_budget(2):
+            self.client.get(f"/tickets/{tid}", headers=headers)
+        with self.assertRaises(AssertionError) as ctx:
+            with self.query_budget(1):
+                self.client.get(f"/tickets/{tid}", headers=headers)
+        self.assertIn("GET /tickets/<int:tid> ran 2 statements, budget 1", str(ctx.exception))
+
+    def test_interleaved_statements_keep_their_own_timings(self):
+        conn = SimpleNamespace(info={})
+        first, second = SimpleNamespace(), SimpleNamespace()
+        with self.app.test_request_context():
+            _start_request()
+            _before_cursor_execute(conn, None, "A", None, first, False)
+            _before_cursor_execute(conn, None, "B", None, second, False)
+            _after_cursor_execute(conn, None, "B", None, second, False)
+            _after_cursor_execute(conn, None, "A", None, first, False)
+            # an after without a matching before is skipped, not an error
+            _after_cursor_execute(conn, None, "C", None, SimpleNamespace(), False)
+            queries = g._sql_queries
+        self.assertEqual([q.statement for q in queries], ["B", "A"])
+        self.assertGreaterEqual(queries[1].seconds, queries[0].seconds)
@@ -0,0 +1,86 @@
+# tests/test_ratelimit.py
+import os
+import tempfile
+import unittest
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from application.ratelimit import export_cost, page_cost, rate_limit_key, role_limit
+from application.ratelimit_storage import SQLiteStorage
+from application.util import make_token
+from .test_base import DBTestCase
+
+
+class SQLiteStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.uri = "sqlite:///" + os.path.join(self.tmp.name, "limits.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scheme_is_registered(self):
+        storage = storage_from_string(self.uri)
+        self.assertIsInstance(storage, SQLiteStorage)
+        self.assertTrue(storage.check())
+
+    def test_counters_expire(self):
+        storage = SQLiteStorage(self.uri)
+        self.assertEqual(storage.incr("k", 60), 1)
+        self.assertEqual(storage.incr("k", 60, amount=2), 3)
+        self.assertEqual(storage.get("k"), 3)
+        storage.incr("gone", -1)
+        self.assertEqual(storage.get("gone"), 0)
+        self.assertEqual(storage.incr("gone", 60), 1)
+        storage.clear("k")
+        self.assertEqual(storage.get("k"), 0)
+
+    def test_sliding_window_counter_shared_between_workers(self):
+        # two storages on one file stand in for two gunicorn workers
+        workers = [SlidingWindowCounterRateLimiter(SQLiteStorage(self.uri))
+                   for _ in range(2)]
+        item = parse("5 per minute")
+        hits = [workers[i % 2].hit(item, "terminal-1") for i in range(8)]
+        self.assertEqual(hits, [True] * 5 + [False] * 3)
+        self.assertTrue(workers[0].hit(item, "terminal-2"))
+        self.assertFalse(workers[1].hit(item, "terminal-2", cost=5))
+
+    def test_fixed_window(self):
+        limiter = FixedWindowRateLimiter(SQLiteStorage(self.uri))
+        item = parse("2 per minute")
+        self.assertEqual([limiter.hit(item, "x") for _ in range(3)], [True, True, False])
+        self.assertEqual(limiter.get_window_stats(item, "x").remaining, 0)
+
+
+class RateLimitKeyTests(DBTestCase):
+    def _context(self, path="/mechanics/", token=None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return self.app.test_request_context(
+            path, headers=headers, environ_base={"REMOTE_ADDR": "10.0.0.7"}, **kwargs)
+
+    def test_keyed_on_token_subject_else_client_ip(self):
+        with self._context(token=make_token(42)):
+            self.assertEqual(rate_limit_key(), "user:42")
+        with self._context(token="not-a-jwt"):
+            self.assertEqual(rate_limit_key(), "ip:10.0.0.7")
+        with self._context():
+            self.assertEqual(rate_limit_key(), "ip:10.0.0.7")
+
+    def test_limits_by_role(self):
+        limits = self.app.config["RATELIMIT_ROLE_LIMITS"]
+        with self._context():
+            self.assertEqual(role_limit(), limits["anonymous"])
+        with self._context(token=make_token(1, role="admin")):
+            self.assertEqual(role_limit(), limits["admin"])
+        with self._context(token=make_token(1, role="mechanic")):
+            self.assertEqual(role_limit(), limits["user"])
+
+    def test_cost_scales_with_page_size(self):
+        for query, cost in [("", 1), ("?limit=50", 1), ("?limit=51", 2),
+                            ("?limit=10000", 4), ("?limit=abc", 1)]:
+            with self._context("/mechanics/" + query):
+                self.assertEqual(page_cost(), cost, query)
+        with self._context("/tickets/export"):
+            self.assertEqual(export_cost(), self.app.config["RATELIMIT_EXPORT_COST"])
@@ -0,0 +1,38 @@
+# tests/test_schemas.py
+import unittest
+
+from application.models import User, Mechanic, Inventory, ServiceTicket
+from application.schemas import (
+    user_schema, users_schema, mechanic_schema, inventory_schema,
+    ticket_schema, tickets_schema,
+    dump_user, dump_users, dump_mechanic, dump_inventory,
+    dump_ticket, dump_tickets,
+)
+
+
+class SerializerParityTests(unittest.TestCase):
+    """The compiled serializers must match marshmallow's dump exactly."""
+
+    def _ticket(self, tid, mechanics=2, parts=3):
+        t = ServiceTicket(id=tid, description=f"Job {tid}", status="open",
+                          primary_mechanic_id=None if tid % 2 else 1)
+        t.mechanics = [Mechanic(id=i, name=f"M{i}") for i in range(mechanics)]
+        t.parts = [Inventory(id=i, name=f"P{i}") for i in range(parts)]
+        return t
+
+    def test_user_parity(self):
+        users = [User(id=1, name="Alice", email="a@example.com"),
+                 User(id=2, name=None, email="b@example.com")]
+        self.assertEqual(dump_user(users[0]), user_schema.dump(users[0]))
+        self.assertEqual(dump_users(users), users_schema.dump(users))
+
+    def test_mechanic_and_inventory_parity(self):
+        m = Mechanic(id=4, name="Sam")
+        p = Inventory(id=9, name="Rotor")
+        self.assertEqual(dump_mechanic(m), mechanic_schema.dump(m))
+        self.assertEqual(dump_inventory(p), inventory_schema.dump(p))
+
+    def test_ticket_parity(self):
+        tickets = [self._ticket(1), self._ticket(2, mechanics=0, parts=0)]
+        self.assertEqual(dump_ticket(tickets[0]), ticket_schema.dump(tickets[0]))
+        self.assertEqual(dump_tickets(tickets), tickets_schema.dump(tickets))
@@ -1,4 +1,12 @@
 # tests/test_tickets.py
+import json
+
+from sqlalchemy import select
+
+from application.extensions import db
+from application.models import Mechanic, ServiceTicket
+from application.pagination import encode_cursor
+from application.search import FTS_INDEX, FTS_TABLE, is_search_object, ranked_matches
 from .test_base import DBTestCase
 
 
@@ -16,7 +24,44 @@ class TicketsRouteTests(DBTestCase):
             "/tickets/", json={"description": "Noise"}, headers=headers)
         res = self.client.get("/tickets/", headers=headers)
         self.assertEqual(res.status_code, 200)
-        self.assertIsInstance(res.get_json(), list)
+        self.assertIsInstance(res.get_json()["items"], list)
+        self.assertIsNone(res.get_json()["next_cursor"])
+
+    def test_ticket_list_cursor_pagination(self):
+        headers = self.auth_headers()
+        for i in range(5):
+            self.client.post(
+                "/tickets/", json={"description": f"Job {i}"}, headers=headers)
+        seen = []
+        res = self.client.get("/tickets/?limit=2", headers=headers)
+        while True:
+            self.assertEqual(res.status_code, 200)
+            body = res.get_json()
+            self.assertLessEqual(len(body["items"]), 2)
+            seen.extend(t["id"] for t in body["items"])
+            if not body["next_cursor"]:
+                break
+            res = self.client.get(
+                f"/tickets/?limit=2&after={body['next_cursor']}", headers=headers)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_ticket_list_400_bad_cursor(self):
+        headers = self.auth_headers()
+        res = self.client.get("/tickets/?after=not-a-cursor", headers=headers)
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get("/tickets/?limit=abc", headers=headers)
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get(f"/tickets/?user_id={10 ** 30}", headers=headers)
+        self.assertEqual(res.status_code, 400)
+        after = encode_cursor({"s": "rank", "id": 1, "v": "best"})
+        res = self.client.get(f"/tickets/search?q=brake&after={after}", headers=headers)
+        self.assertEqual(res.status_code, 400)
+
+    def test_list_tickets_400_unknown_view(self):
+        headers = self.auth_headers()
+        res = self.client.get("/tickets/?view=everything", headers=headers)
+        self.assertEqual(res.status_code, 400)
 
     def test_ticket_get_by_id_200(self):
         headers = self.auth_headers()
@@ -37,6 +82,19 @@ class TicketsRouteTests(DBTestCase):
         self.assertEqual(res.status_code, 200)
         # optional: assert mechanic id present in response
 
+    def test_ticket_edit_mechanics_add_and_remove(self):
+        headers = self.auth_headers()
+        mids = [self.client.post("/mechanics/", json={"name": f"M{i}"},
+                                 headers=headers).get_json()["id"] for i in range(3)]
+        tid = self.client.post(
+            "/tickets/", json={"description": "Alignment"}, headers=headers).get_json()["id"]
+        self.client.put(f"/tickets/{tid}/edit",
+                        json={"add_ids": mids[:2]}, headers=headers)
+        res = self.client.put(f"/tickets/{tid}/edit", json={
+            "add_ids": [mids[1], mids[2], 999], "remove_ids": [mids[0]]}, headers=headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(m["id"] for m in res.get_json()["mechanics"]), mids[1:])
+
     def test_ticket_add_part_post_200(self):
         headers = self.auth_headers()
         pid = self.client.post(
@@ -47,6 +105,32 @@ class TicketsRouteTests(DBTestCase):
             f"/tickets/{tid}/add-part/{pid}", headers=headers)
         self.assertEqual(res.status_code, 200)
 
+    def test_ticket_edit_parts_put_200(self):
+        headers = self.auth_headers()
+        pids = [self.client.post("/inventory/", json={"name": f"Part {i}"},
+                                 headers=headers).get_json()["id"] for i in range(3)]
+        tid = self.client.post(
+            "/tickets/", json={"description": "Brake job"}, headers=headers).get_json()["id"]
+        self.client.post(f"/tickets/{tid}/add-part/{pids[0]}", headers=headers)
+        res = self.client.put(f"/tickets/{tid}/parts", json={
+            "add_ids": pids + [999], "remove_ids": [pids[0]]}, headers=headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(p["id"] for p in res.get_json()["parts"]), pids[1:])
+
+    def test_ticket_edit_parts_400_bad_ids(self):
+        headers = self.auth_headers()
+        tid = self.client.post(
+            "/tickets/", json={"description": "Brake job"}, headers=headers).get_json()["id"]
+        res = self.client.put(
+            f"/tickets/{tid}/parts", json={"add_ids": "1,2"}, headers=headers)
+        self.assertEqual(res.status_code, 400)
+        for path in (f"/tickets/{tid}/parts", f"/tickets/{tid}/edit"):
+            res = self.client.put(path, json=[1, 2], headers=headers)
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json(), {"error": "body must be a JSON object"})
+            res = self.client.put(path, json={"add_ids": [2 ** 70]}, headers=headers)
+            self.assertEqual(res.status_code, 400)
+
     def test_ticket_delete_200(self):
         headers = self.auth_headers()
         tid = self.client.post(
@@ -55,6 +139,51 @@ class TicketsRouteTests(DBTestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(res.get_json()["deleted"], tid)
 
+    def test_ticket_bulk_create_per_item_results(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Pat"}, headers=headers).get_json()["id"]
+        res = self.client.post("/tickets/bulk", json=[
+            {"description": "Brakes", "primary_mechanic_id": mid},
+            {"primary_mechanic_id": mid},
+            {"description": "Tires", "primary_mechanic_id": 999},
+        ], headers=headers)
+        self.assertEqual(res.status_code, 207)
+        body = res.get_json()
+        self.assertEqual((body["created"], body["failed"]), (2, 1))
+        first, second, third = body["results"]
+        self.assertEqual(first["ticket"]["primary_mechanic_id"], mid)
+        self.assertEqual(second, {"index": 1, "status": 400,
+                                  "error": "description required"})
+        self.assertIsNone(third["ticket"]["primary_mechanic_id"])
+        got = self.client.get(f"/tickets/{third['ticket']['id']}", headers=headers)
+        self.assertEqual(got.get_json(), third["ticket"])
+
+    def test_ticket_bulk_create_rejects_bool_ids_and_non_string_descriptions(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Pat"}, headers=headers).get_json()["id"]
+        res = self.client.post("/tickets/bulk", json=[
+            {"description": "Brakes", "primary_mechanic_id": True},
+            {"description": ["Tires"]},
+            {"description": "Oil", "primary_mechanic_id": mid},
+            {"description": "Belt", "primary_mechanic_id": 2 ** 70},
+        ], headers=headers)
+        self.assertEqual(res.status_code, 207)
+        first, second, third, fourth = res.get_json()["results"]
+        self.assertEqual(first["error"], "primary_mechanic_id must be an integer")
+        self.assertEqual(second["error"], "description must be a string")
+        self.assertEqual(fourth, {"index": 3, "status": 400,
+                                  "error": "primary_mechanic_id is out of range"})
+        got = self.client.get(f"/tickets/{third['ticket']['id']}", headers=headers)
+        self.assertEqual(got.get_json(), third["ticket"])
+
+    def test_ticket_bulk_create_400_not_a_list(self):
+        headers = self.auth_headers()
+        res = self.client.post(
+            "/tickets/bulk", json={"description": "One"}, headers=headers)
+        self.assertEqual(res.status_code, 400)
+
     def test_ticket_create_400_missing_description(self):
         headers = self.auth_headers()
         res = self.client.post("/tickets/", json={}, headers=headers)
@@ -64,3 +193,352 @@ class TicketsRouteTests(DBTestCase):
         headers = self.auth_headers()
         res = self.client.get("/tickets/999999", headers=headers)
         self.assertEqual(res.status_code, 404)
+
+
+class TicketQueryCountTests(DBTestCase):
+    """Pin the number of SQL statements per endpoint to catch N+1s."""
+
+    def _seed(self, headers, tickets=3):
+        mids = [self.client.post("/mechanics/", json={"name": f"M{i}"},
+                                 headers=headers).get_json()["id"] for i in range(2)]
+        pids = [self.client.post("/inventory/", json={"name": f"P{i}"},
+                                 headers=headers).get_json()["id"] for i in range(2)]
+        tids = []
+        for i in range(tickets):
+            tid = self.client.post(
+                "/tickets/", json={"description": f"Job {i}"}, headers=headers).get_json()["id"]
+            self.client.put(f"/tickets/{tid}/edit",
+                            json={"add_ids": mids}, headers=headers)
+            for pid in pids:
+                self.client.post(f"/tickets/{tid}/add-part/{pid}", headers=headers)
+            tids.append(tid)
+        db.session.remove()
+        return tids, pids
+
+    def test_list_tickets_query_count_is_constant(self):
+        headers = self.auth_headers()
+        self._seed(headers, tickets=2)
+        with self.count_queries() as small:
+            self.client.get("/tickets/", headers=headers)
+        self._seed(headers, tickets=6)
+        with self.count_queries() as large:
+            res = self.client.get("/tickets/", headers=headers)
+        self.assertEqual(len(res.get_json()["items"]), 8)
+        # tickets page + one selectin query per collection
+        self.assertEqual(len(small), 3)
+        self.assertEqual(len(large), 3)
+
+    def test_get_ticket_query_count(self):
+        headers = self.auth_headers()
+        tids, _ = self._seed(headers, tickets=1)
+        with self.count_queries() as statements:
+            res = self.client.get(f"/tickets/{tids[0]}", headers=headers)
+        self.assertEqual(len(res.get_json()["mechanics"]), 2)
+        self.assertEqual(len(res.get_json()["parts"]), 2)
+        self.assertEqual(len(statements), 2)
+
+    def test_add_part_does_not_load_collections_before_insert(self):
+        headers = self.auth_headers()
+        tids, pids = self._seed(headers, tickets=1)
+        pid = self.client.post("/inventory/", json={"name": "Extra"},
+                               headers=headers).get_json()["id"]
+        db.session.remove()
+        with self.count_queries() as statements:
+            self.client.post(f"/tickets/{tids[0]}/add-part/{pid}", headers=headers)
+        # ticket, part, insert-or-ignore, usage counter, version bump; then reload
+        self.assertTrue(statements[2].startswith("INSERT INTO ticket_parts"))
+        self.assertTrue(statements[3].startswith("INSERT INTO part_usage"))
+        self.assertEqual(len(statements), 8)
+
+    def test_delete_ticket_query_count(self):
+        headers = self.auth_headers()
+        tids, _ = self._seed(headers, tickets=1)
+        with self.count_queries() as statements:
+            res = self.client.delete(f"/tickets/{tids[0]}", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        # ticket lookup + two association deletes + usage uncount + ticket delete
+        self.assertEqual(len(statements), 5)
+
+    def test_list_tickets_summary_view_single_query(self):
+        headers = self.auth_headers()
+        tids, _ = self._seed(headers, tickets=3)
+        with self.count_queries() as statements:
+            res = self.client.get("/tickets/?view=summary&limit=2", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        body = res.get_json()
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(body["items"][0], {
+            "id": tids[-1], "status": "open", "primary_mechanic_id": None,
+            "mechanic_count": 2, "part_count": 2})
+        res = self.client.get(
+            f"/tickets/?view=summary&after={body['next_cursor']}", headers=headers)
+        self.assertEqual([t["id"] for t in res.get_json()["items"]], [tids[0]])
+
+    def test_bulk_create_uses_one_insert(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Pat"}, headers=headers).get_json()["id"]
+        payload = [{"description": f"Job {i}", "primary_mechanic_id": mid}
+                   for i in range(25)]
+        with self.count_queries() as statements:
+            res = self.client.post("/tickets/bulk", json=payload, headers=headers)
+        self.assertEqual(res.status_code, 201)
+        # mechanic IN lookup + one batched INSERT
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[1].startswith("INSERT INTO service_ticket"))
+
+    def test_edit_parts_is_set_based(self):
+        headers = self.auth_headers()
+        tids, old_pids = self._seed(headers, tickets=1)
+        pids = [self.client.post("/inventory/", json={"name": f"Brake {i}"},
+                                 headers=headers).get_json()["id"] for i in range(15)]
+        db.session.remove()
+        with self.count_queries() as statements:
+            res = self.client.put(f"/tickets/{tids[0]}/parts", json={
+                "add_ids": pids, "remove_ids": old_pids}, headers=headers)
+        self.assertEqual(len(res.get_json()["parts"]), 15)
+        # ticket, version bump, INSERT ... SELECT ... RETURNING,
+        # stock-tracked check, usage count, usage uncount, DELETE; then reload
+        self.assertEqual(len(statements), 10)
+
+    def test_edit_mechanics_is_set_based(self):
+        headers = self.auth_headers()
+        tids, _ = self._seed(headers, tickets=1)
+        mechanics = [Mechanic(name=f"Crew {i}") for i in range(300)]
+        db.session.add_all(mechanics)
+        db.session.commit()
+        mids = [m.id for m in mechanics]
+        db.session.remove()
+        with self.count_queries() as statements:
+            res = self.client.put(f"/tickets/{tids[0]}/edit", json={
+                "add_ids": mids, "remove_ids": mids[:100]}, headers=headers)
+        self.assertEqual(len(res.get_json()["mechanics"]), 202)
+        # ticket, INSERT ... SELECT, DELETE, version bump; then reload
+        self.assertEqual(len(statements), 7)
+
+    def test_export_streams_ndjson_in_chunks(self):
+        headers = self.auth_headers()
+        self._seed(headers, tickets=5)
+        self.app.config["EXPORT_CHUNK_SIZE"] = 2
+        try:
+            with self.count_queries() as statements:
+                res = self.client.get("/tickets/export", headers=headers)
+                lines = res.get_data(as_text=True).splitlines()
+        finally:
+            self.app.config["EXPORT_CHUNK_SIZE"] = 500
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, "application/x-ndjson")
+        tickets = [json.loads(line) for line in lines]
+        self.assertEqual([t["id"] for t in tickets], sorted(t["id"] for t in tickets))
+        self.assertEqual(len(tickets), 5)
+        self.assertTrue(all(len(t["parts"]) == 2 for t in tickets))
+        # chunks of 2, 2, 1: one SELECT plus a selectin pair each
+        self.assertEqual(len(statements), 3 * 3)
+
+
+class TicketFilterTests(DBTestCase):
+    def _seed(self, headers):
+        mid = self.client.post("/mechanics/", json={"name": "Pat"},
+                               headers=headers).get_json()["id"]
+        pid = self.client.post("/inventory/", json={"name": "Pad"},
+                               headers=headers).get_json()["id"]
+        tids = [self.client.post("/tickets/", json={"description": f"Job {i}"},
+                                 headers=headers).get_json()["id"] for i in range(4)]
+        self.client.put(f"/tickets/{tids[1]}/edit", json={"add_ids": [mid]}, headers=headers)
+        self.client.put(f"/tickets/{tids[3]}/edit", json={"add_ids": [mid]}, headers=headers)
+        self.client.post(f"/tickets/{tids[2]}/add-part/{pid}", headers=headers)
+        ticket = db.session.get(ServiceTicket, tids[3])
+        ticket.status = "closed"
+        db.session.commit()
+        return mid, pid, tids
+
+    def _ids(self, headers, qs):
+        res = self.client.get(f"/tickets/?{qs}", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        return [t["id"] for t in res.get_json()["items"]]
+
+    def test_list_tickets_filters(self):
+        headers = self.auth_headers()
+        mid, pid, tids = self._seed(headers)
+        self.assertEqual(self._ids(headers, f"mechanic_id={mid}"), [tids[3], tids[1]])
+        self.assertEqual(self._ids(headers, f"part_id={pid}"), [tids[2]])
+        self.assertEqual(self._ids(headers, "status=closed"), [tids[3]])
+        self.assertEqual(self._ids(headers, f"status=open&mechanic_id={mid}"), [tids[1]])
+        user_id = db.session.get(ServiceTicket, tids[0]).user_id
+        self.assertEqual(len(self._ids(headers, f"user_id={user_id}")), 4)
+        self.assertEqual(self._ids(headers, f"user_id={user_id + 1}"), [])
+        # filters apply to the summary view and paginate like the full list
+        res = self.client.get(f"/tickets/?view=summary&mechanic_id={mid}&limit=1",
+                              headers=headers).get_json()
+        self.assertEqual([t["id"] for t in res["items"]], [tids[3]])
+        res = self.client.get(
+            f"/tickets/?view=summary&mechanic_id={mid}&limit=1&after={res['next_cursor']}",
+            headers=headers).get_json()
+        self.assertEqual([t["id"] for t in res["items"]], [tids[1]])
+
+    def test_list_tickets_400_bad_filter(self):
+        headers = self.auth_headers()
+        res = self.client.get("/tickets/?mechanic_id=abc", headers=headers)
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("mechanic_id", res.get_json()["error"])
+
+    def test_filters_use_composite_indexes(self):
+        def plan(sql):
+            rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+            return " ".join(row[-1] for row in rows)
+        self.assertIn("ix_service_ticket_status_id", plan(
+            "SELECT id FROM service_ticket WHERE status = 'open' ORDER BY id DESC LIMIT 20"))
+        self.assertIn("ix_service_ticket_user_id_id", plan(
+            "SELECT id FROM service_ticket WHERE user_id = 1 ORDER BY id DESC LIMIT 20"))
+        self.assertIn("ix_ticket_mechanics_mechanic_id_ticket_id", plan(
+            "SELECT ticket_id FROM ticket_mechanics WHERE mechanic_id = 1"))
+        self.assertIn("ix_ticket_parts_inventory_id_ticket_id", plan(
+            "SELECT ticket_id FROM ticket_parts WHERE inventory_id = 1"))
+
+
+class TicketETagTests(DBTestCase):
+    def test_get_ticket_304_until_changed(self):
+        headers = self.auth_headers()
+        mid = self.client.post(
+            "/mechanics/", json={"name": "Pat"}, headers=headers).get_json()["id"]
+        tid = self.client.post(
+            "/tickets/", json={"description": "Noise"}, headers=headers).get_json()["id"]
+        etag = self.client.get(f"/tickets/{tid}", headers=headers).headers["ETag"]
+        with self.count_queries() as statements:
+            res = self.client.get(f"/tickets/{tid}",
+                                  headers={**headers, "If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(len(statements), 1)
+
+        self.client.put(f"/tickets/{tid}/edit", json={"add_ids": [mid]}, headers=headers)
+        res = self.client.get(f"/tickets/{tid}", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+        etag = res.headers["ETag"]
+        # renaming an assigned mechanic changes the ticket's representation
+        self.client.put(f"/mechanics/{mid}", json={"name": "Pat T"}, headers=headers)
+        res = self.client.get(f"/tickets/{tid}", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_list_tickets_304_with_one_query(self):
+        headers = self.auth_headers()
+        for i in range(3):
+            self.client.post("/tickets/", json={"description": f"Job {i}"}, headers=headers)
+        etag = self.client.get("/tickets/", headers=headers).headers["ETag"]
+        with self.count_queries() as statements:
+            res = self.client.get("/tickets/", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(len(statements), 1)
+        self.client.post("/tickets/", json={"description": "New"}, headers=headers)
+        res = self.client.get("/tickets/", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_list_tickets_etag_tracks_links_and_next_page(self):
+        headers = self.auth_headers()
+        tids = [self.client.post("/tickets/", json={"description": f"Job {i}"},
+                                 headers=headers).get_json()["id"] for i in range(3)]
+        pid = self.client.post("/inventory/", json={"name": "Pad"},
+                               headers=headers).get_json()["id"]
+        self.client.post(f"/tickets/{tids[2]}/add-part/{pid}", headers=headers)
+
+        def revalidate(etag):
+            return self.client.get("/tickets/?limit=2",
+                                   headers={**headers, "If-None-Match": etag})
+        etag = self.client.get("/tickets/?limit=2", headers=headers).headers["ETag"]
+        self.assertEqual(revalidate(etag).status_code, 304)
+        # renaming a part on the page
+        self.client.put(f"/inventory/{pid}", json={"name": "Pad B"}, headers=headers)
+        res = revalidate(etag)
+        self.assertEqual(res.status_code, 200)
+        etag = res.headers["ETag"]
+        self.assertEqual(revalidate(etag).status_code, 304)
+        # the only ticket on the next page goes away: next_cursor becomes null
+        self.client.delete(f"/tickets/{tids[0]}", headers=headers)
+        res = revalidate(etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.get_json()["next_cursor"])
+
+    def test_edit_mechanics_if_match_412_on_stale_etag(self):
+        headers = self.auth_headers()
+        mids = [self.client.post("/mechanics/", json={"name": f"M{i}"},
+                                 headers=headers).get_json()["id"] for i in range(2)]
+        tid = self.client.post(
+            "/tickets/", json={"description": "Noise"}, headers=headers).get_json()["id"]
+        etag = self.client.get(f"/tickets/{tid}", headers=headers).headers["ETag"]
+        res = self.client.put(f"/tickets/{tid}/edit", json={"add_ids": [mids[0]]},
+                              headers={**headers, "If-Match": etag})
+        self.assertEqual(res.status_code, 200)
+        res = self.client.put(f"/tickets/{tid}/edit", json={"add_ids": [mids[1]]},
+                              headers={**headers, "If-Match": etag})
+        self.assertEqual(res.status_code, 412)
+        ticket = self.client.get(f"/tickets/{tid}", headers=headers).get_json()
+        self.assertEqual([m["id"] for m in ticket["mechanics"]], [mids[0]])
+
+
+class TicketSearchTests(DBTestCase):
+    def _create(self, headers, *descriptions):
+        return [self.client.post("/tickets/", json={"description": d},
+                                 headers=headers).get_json()["id"]
+                for d in descriptions]
+
+    def test_search_ranks_and_paginates(self):
+        headers = self.auth_headers()
+        tids = self._create(headers, "Brake pads worn", "Oil change",
+                            "Brake fluid flush, brake lines bled", "Tire rotation")
+        res = self.client.get("/tickets/search?q=brake&limit=1", headers=headers)
+        self.assertEqual(res.status_code, 200)
+        body = res.get_json()
+        # more occurrences in a similar-length description ranks higher
+        self.assertEqual([t["id"] for t in body["items"]], [tids[2]])
+        res = self.client.get(
+            f"/tickets/search?q=brake&limit=1&after={body['next_cursor']}", headers=headers)
+        body = res.get_json()
+        self.assertEqual([t["id"] for t in body["items"]], [tids[0]])
+        self.assertIsNone(body["next_cursor"])
+        res = self.client.get("/tickets/search?q=BRAKE+worn", headers=headers)
+        self.assertEqual([t["id"] for t in res.get_json()["items"]], [tids[0]])
+
+    def test_search_index_follows_writes(self):
+        headers = self.auth_headers()
+        tid, other = self._create(headers, "Replace wiper blades", "Wiper fluid")
+        ticket = db.session.get(ServiceTicket, tid)
+        ticket.description = "Replace headlight bulb"
+        db.session.commit()
+        self.client.delete(f"/tickets/{other}", headers=headers)
+
+        def found(q):
+            res = self.client.get(f"/tickets/search?q={q}", headers=headers)
+            return [t["id"] for t in res.get_json()["items"]]
+        self.assertEqual(found("wiper"), [])
+        self.assertEqual(found("headlight"), [tid])
+
+    def test_search_falls_back_to_like_without_an_index(self):
+        headers = self.auth_headers()
+        tids = self._create(headers, "Brake pads worn", "Oil change", "brake_light out")
+        matches = ranked_matches("oracle", ["brake", "worn"])
+        self.assertEqual(db.session.scalars(select(matches.c.id)).all(), [tids[0]])
+        # "_" is a LIKE wildcard; it only matches itself here
+        matches = ranked_matches("oracle", ["brake_"])
+        self.assertEqual(db.session.scalars(select(matches.c.id)).all(), [tids[2]])
+
+    def test_autogenerate_skips_search_objects(self):
+        for name in (FTS_TABLE, FTS_TABLE + "_data", FTS_TABLE + "_config"):
+            self.assertTrue(is_search_object(name, "table"))
+        self.assertTrue(is_search_object(FTS_INDEX, "index"))
+        self.assertFalse(is_search_object("service_ticket", "table"))
+
+    def test_search_requires_words(self):
+        headers = self.auth_headers()
+        # FTS5 operators and quotes are stripped, not parsed
+        self.assertEqual(self.client.get('/tickets/search?q="*', headers=headers).status_code, 400)
+        res = self.client.get('/tickets/search?q=NEAR(oil "AND', headers=headers)
+        self.assertEqual(res.status_code, 200)
+
+    def test_search_sort_whitelist(self):
+        headers = self.auth_headers()
+        old, new = self._create(headers, "Brake pads worn", "Brake fluid")
+        res = self.client.get("/tickets/search?q=brake&sort=-id", headers=headers)
+        self.assertEqual([t["id"] for t in res.get_json()["items"]], [new, old])
+        for sort in ("-rank", "name", "--id"):
+            res = self.client.get(f"/tickets/search?q=brake&sort={sort}", headers=headers)
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json(), {"error": "sort must be one of: rank, id, -id"})
@@ -52,3 +52,49 @@ class UsersTestCase(DBTestCase):
             headers={"Authorization": f"Bearer {token}"}
         )
         self.assertEqual(resp.status_code, 200)
+
+    def test_list_users_paginated_by_email(self):
+        headers = self.auth_headers(email="zed@example.com")
+        for email in ["bob@example.com", "amy@example.com"]:
+            self.client.post("/users/", json={"email": email, "password": "pw"})
+        resp = self.client.get("/users/?sort=email&limit=2", headers=headers)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual([u["email"] for u in body["items"]],
+                         ["amy@example.com", "bob@example.com"])
+        resp = self.client.get(
+            f"/users/?sort=email&limit=2&after={body['next_cursor']}", headers=headers)
+        self.assertEqual([u["email"] for u in resp.get_json()["items"]],
+                         ["zed@example.com"])
+
+    def test_login_rehashes_outdated_hash(self):
+        old_hash = generate_password_hash("password123", method="pbkdf2:sha256:500")
+        db.session.add(User(email="old@example.com", password_hash=old_hash))
+        db.session.commit()
+        resp = self.client.post("/users/login", json={
+            "email": "old@example.com", "password": "password123"})
+        self.assertEqual(resp.status_code, 200)
+        db.session.expire_all()
+        user = User.query.filter_by(email="old@example.com").one()
+        self.assertTrue(user.password_hash.startswith(
+            self.app.config["PASSWORD_HASH_METHOD"] + "$"))
+        # rehashing leaves the version alone, so racing logins can't 500
+        self.assertEqual(user.version, 1)
+        # and the upgraded hash still verifies
+        resp = self.client.post("/users/login", json={
+            "email": "old@example.com", "password": "password123"})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_login_wrong_password_401(self):
+        self.client.post("/users/", json={"email": "a@example.com", "password": "right"})
+        resp = self.client.post("/users/login", json={
+            "email": "a@example.com", "password": "wrong"})
+        self.assertEqual(resp.status_code, 401)
+
+    def test_get_user_etag_304(self):
+        headers = self.auth_headers()
+        uid = User.query.filter_by(email="tester@example.com").one().id
+        etag = self.client.get(f"/users/{uid}", headers=headers).headers["ETag"]
+        resp = self.client.get(f"/users/{uid}",
+                               headers={**headers, "If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
@@ -0,0 +1,56 @@
+# tests/test_util.py
+import time
+import unittest
+
+from application.extensions import db
+from application.models import ServiceTicket, User
+from application.util import TokenCache
+from .test_base import DBTestCase
+
+
+class TokenCacheTests(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = TokenCache(maxsize=2)
+        exp = time.time() + 60
+        cache.put("a", {"sub": 1, "exp": exp})
+        cache.put("b", {"sub": 2, "exp": exp})
+        cache.get("a")
+        cache.put("c", {"sub": 3, "exp": exp})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a")["sub"], 1)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_entry_expires_with_token(self):
+        cache = TokenCache(maxsize=10)
+        cache.put("old", {"sub": 1, "exp": time.time() - 1})
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_tokens_without_exp_are_not_cached(self):
+        cache = TokenCache(maxsize=10)
+        cache.put("forever", {"sub": 1})
+        self.assertIsNone(cache.get("forever"))
+
+
+class TokenRequiredTests(DBTestCase):
+    def test_repeat_requests_hit_cache(self):
+        headers = self.auth_headers()
+        cache = self.app.extensions["token_cache"]
+        before = cache.stats()
+        self.client.get("/tickets/", headers=headers)
+        self.client.get("/tickets/", headers=headers)
+        after = cache.stats()
+        self.assertGreaterEqual(after["hits"] - before["hits"], 1)
+
+    def test_login_token_carries_user_id(self):
+        headers = self.auth_headers()
+        tid = self.client.post(
+            "/tickets/", json={"description": "Noise"}, headers=headers).get_json()["id"]
+        owner = db.session.get(ServiceTicket, tid).user_id
+        self.assertEqual(owner, User.query.filter_by(email="tester@example.com").one().id)
+
+    def test_tampered_token_401(self):
+        headers = self.auth_headers()
+        bad = {"Authorization": headers["Authorization"][:-2] + "xx"}
+        res = self.client.get("/tickets/", headers=bad)
+        self.assertEqual(res.status_code, 401)